@@ -0,0 +1,55 @@
+"""Description: Build step for the game "PROJECT: Witchcraft". Packs every
+   file in the images, sounds and fonts folders into one archive with a table
+   of contents, memory-mapped at startup by game_sprites.open_archive. The
+   game uses the loose files when there is no archive, so delete it or run
+   this again after changing any asset.
+"""
+
+# I - IMPORT AND INITIALIZE
+import game_sprites, os, struct
+
+#Folders packed into the archive.
+FOLDERS = ["images", "sounds", "fonts"]
+
+def main():
+    '''This function defines the mainline logic of the archive build step.'''
+
+    #Every regular file of the packed folders, in a fixed order.
+    paths = []
+    for folder in FOLDERS:
+        for name in sorted(os.listdir(folder)):
+            if os.path.isfile(folder+"/"+name):
+                paths.append(folder+"/"+name)
+
+    #Fixed width offsets and sizes, so the table size is known before the
+    #offsets are.
+    toc_size = 0
+    for path in paths:
+        toc_size += len(path.encode("utf-8")) + 23
+    offset = len(game_sprites.ARCHIVE_MAGIC) + 4 + toc_size
+
+    #Table of contents, "path<tab>offset<tab>size" lines.
+    toc = ""
+    sizes = []
+    for path in paths:
+        size = os.path.getsize(path)
+        toc += "%s\t%010d\t%010d\n" %(path, offset, size)
+        sizes.append(size)
+        offset += size
+
+    #Write header, table and then every file back to back.
+    archive = open(game_sprites.ARCHIVE, 'wb')
+    archive.write(game_sprites.ARCHIVE_MAGIC)
+    archive.write(struct.pack("<I", toc_size))
+    archive.write(toc.encode("utf-8"))
+    for path in paths:
+        asset = open(path, 'rb')
+        archive.write(asset.read())
+        asset.close()
+    archive.close()
+
+    print("Packed %d files into %s (%d bytes)" %(len(paths),
+        game_sprites.ARCHIVE, offset))
+
+# Call the main function
+main()
@@ -0,0 +1,74 @@
+"""Description: Build step for the game "PROJECT: Witchcraft". Packs every
+   small sprite image used by game_sprites into one atlas image with an index
+   file of their positions, read at startup by game_sprites.load_atlas.
+   Run this again whenever an image in the images folder changes.
+"""
+
+# I - IMPORT AND INITIALIZE
+import pygame, game_sprites, os
+
+#Widest row of the atlas, images are packed in rows under it.
+MAX_WIDTH = 512
+#Gap between packed images.
+PADDING = 1
+
+def pack(sizes):
+    '''This function accepts a dictionary of image names to (width, height)
+    sizes and places them in shelves, tallest first. Returns the dictionary
+    of names to (x, y) positions and the (width, height) of the atlas.'''
+
+    #Tallest images first so each shelf wastes little height.
+    names = sorted(sizes, key=lambda name: (-sizes[name][1], -sizes[name][0],
+                                            name))
+    positions = {}
+    x_pos, y_pos, shelf_height, width = 0, 0, 0, 0
+    for name in names:
+        image_width, image_height = sizes[name]
+        #Start a new shelf when the image does not fit in the row.
+        if x_pos + image_width > MAX_WIDTH:
+            x_pos = 0
+            y_pos += shelf_height + PADDING
+            shelf_height = 0
+        positions[name] = (x_pos, y_pos)
+        x_pos += image_width + PADDING
+        shelf_height = max(shelf_height, image_height)
+        width = max(width, x_pos - PADDING)
+
+    #Return positions and size of atlas.
+    return positions, (width, y_pos + shelf_height)
+
+def main():
+    '''This function defines the mainline logic of the atlas build step.'''
+
+    #Only images converted with alpha are packed, large opaque screens are not.
+    images = {}
+    for path, mode in game_sprites.IMAGE_MANIFEST:
+        if mode == "alpha":
+            name = os.path.splitext(os.path.basename(path))[0]
+            images[name] = pygame.image.load(path)
+
+    #Place images and create an empty transparent atlas.
+    positions, size = pack(dict((name, images[name].get_size())
+                                for name in images))
+    atlas = pygame.Surface(size, pygame.SRCALPHA, 32)
+    atlas.fill((0,0,0,0))
+
+    #Copy pixels unchanged, max blending with a clear atlas avoids darkening
+    #the edges of images.
+    for name in images:
+        atlas.blit(images[name], positions[name],
+                   special_flags=pygame.BLEND_RGBA_MAX)
+    pygame.image.save(atlas, game_sprites.ATLAS_IMAGE)
+
+    #Write index, one "name x y width height" line per image.
+    index = open(game_sprites.ATLAS_INDEX, 'w')
+    for name in sorted(images):
+        index.write("%s %d %d %d %d\n" %((name,) + positions[name] +
+                                          images[name].get_size()))
+    index.close()
+
+    print("Packed %d images into %s (%dx%d)" %((len(images),
+        game_sprites.ATLAS_IMAGE) + size))
+
+# Call the main function
+main()
@@ -0,0 +1,442 @@
+"""Description: Enemy bullet engine for the game "PROJECT: Witchcraft". Keeps
+   every enemy bullet as one row of NumPy arrays instead of one sprite each,
+   so bullets are moved, culled and collided in whole-array passes. When
+   NumPy is not installed, game_sprites.Bullet_group is used instead.
+"""
+
+# I - IMPORT AND INITIALIZE
+import pygame, game_sprites
+
+#NumPy is optional, the sprite group is used without it.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#Most live enemy bullets before volleys are degraded, for the engine and
+#for the slower sprite group.
+ENGINE_BUDGET = 4000
+SPRITE_BUDGET = 400
+
+#Name and type of each array kept per bullet.
+FIELDS = [("x", "float64"), ("y", "float64"), ("dx", "float64"),
+          ("dy", "float64"), ("type", "int16"), ("grazed", "int8"),
+          ("graze_timer", "int16")]
+
+class Bullet_engine(object):
+    '''This class keeps every enemy bullet in arrays of structures, one array
+    per field. It is updated and drawn like a sprite group, with the same
+    collision methods as game_sprites.Bullet_group.'''
+
+    def __init__(self, screen, capacity = 1024):
+        '''This method initializes the engine using the screen parameter
+        to know the playfield size and the capacity parameter as the number
+        of bullets to make room for at first.'''
+
+        #Set up arrays and count of live bullets.
+        self.__capacity = capacity
+        self.__count = 0
+        self.__fields = {}
+        for name, dtype in FIELDS:
+            self.__fields[name] = numpy.zeros(capacity, dtype)
+
+        #Playfield, score tab is not part of it.
+        self.__area = game_sprites.playfield(screen)
+        self.__culled = 0
+        self.__total_culled = 0
+        self.__graze_frames = 10
+        self.__trig = (0, None, None)
+
+        #Shared bullet images and their sizes by type, used to find rects.
+        self.__images = []
+        for shoot_type in range(len(game_sprites.BULLET_SPEEDS)):
+            self.__images.append(game_sprites.load_image(
+                "images/bullet"+str(shoot_type)+".png"))
+        self.__widths = numpy.array([image.get_width() for image in
+                                     self.__images])
+        self.__heights = numpy.array([image.get_height() for image in
+                                      self.__images])
+        self.__radii = numpy.array(game_sprites.BULLET_RADII, "float64")
+
+        #Spatial hash of the playfield, rebuilt when bullets changed. Bullets
+        #are in the cell of their center, queries reach out by half the
+        #biggest bullet.
+        self.__cell = game_sprites.GRID_CELL
+        self.__columns = -(-self.__area.width//self.__cell)
+        self.__rows = -(-self.__area.height//self.__cell)
+        self.__reach = int(max(self.__widths.max(), self.__heights.max())//2)+1
+        self.__grid = None
+
+    def __len__(self):
+        '''This method returns the number of live bullets.'''
+
+        #Return instance.
+        return self.__count
+
+    def __grow(self, needed):
+        '''This method doubles the capacity of every array until the needed
+        parameter number of bullets fits, keeping live bullets.'''
+
+        #Double capacity until it fits.
+        capacity = self.__capacity
+        while capacity < needed:
+            capacity *= 2
+
+        #Copy live rows into bigger arrays.
+        for name, dtype in FIELDS:
+            array = numpy.zeros(capacity, dtype)
+            array[:self.__count] = self.__fields[name][:self.__count]
+            self.__fields[name] = array
+        self.__capacity = capacity
+
+    def __compact(self, keep):
+        '''This method removes every live bullet whose value in the keep
+        parameter, a boolean array, is False.'''
+
+        #Move kept rows to the front of every array.
+        count = int(numpy.count_nonzero(keep))
+        if count == self.__count:
+            return
+        for name, dtype in FIELDS:
+            array = self.__fields[name]
+            array[:count] = array[:self.__count][keep]
+        self.__count = count
+        self.__grid = None
+
+    def __rects(self, indexes = None):
+        '''This method returns the left, top, right and bottom arrays of the
+        rects of live bullets, positioned like a sprite rect center. Only the
+        bullets of the indexes parameter array are included if given.'''
+
+        #All live bullets by default.
+        if indexes is None:
+            indexes = slice(0, self.__count)
+
+        #Rect sizes depend on type, centers are truncated to pixels.
+        fields = self.__fields
+        types = fields["type"][indexes]
+        widths = self.__widths[types]
+        heights = self.__heights[types]
+        lefts = fields["x"][indexes].astype(int) - widths//2
+        tops = fields["y"][indexes].astype(int) - heights//2
+
+        #Return rect sides.
+        return lefts, tops, lefts + widths, tops + heights
+
+    def __build_grid(self):
+        '''This method sorts live bullets by the grid cell of their center
+        and keeps where every cell starts, so a cell is a slice.'''
+
+        #Cells of bullets off the playfield are clamped to its edge.
+        count = self.__count
+        columns = numpy.clip(self.__fields["x"][:count].astype(int) //
+                             self.__cell, 0, self.__columns-1)
+        rows = numpy.clip(self.__fields["y"][:count].astype(int) //
+                          self.__cell, 0, self.__rows-1)
+        cells = rows*self.__columns + columns
+
+        #Bullet indexes in cell order and start of every cell.
+        order = numpy.argsort(cells, kind="stable")
+        starts = numpy.zeros(self.__columns*self.__rows+1, int)
+        numpy.cumsum(numpy.bincount(cells, minlength=len(starts)-1),
+                     out=starts[1:])
+        self.__grid = (order, starts)
+
+    def query(self, rect):
+        '''This method returns the array of indexes of bullets in the grid
+        cells near the rect parameter. Only those can collide with it.'''
+
+        #Build once after bullets changed.
+        if self.__grid is None:
+            self.__build_grid()
+        order, starts = self.__grid
+
+        #Cells covered by rect, clamped like bullets.
+        cell, reach = self.__cell, self.__reach
+        left = min(max((rect.left-reach)//cell, 0), self.__columns-1)
+        right = min(max((rect.right+reach)//cell, 0), self.__columns-1)
+        top = min(max((rect.top-reach)//cell, 0), self.__rows-1)
+        bottom = min(max((rect.bottom+reach)//cell, 0), self.__rows-1)
+
+        #Cells of a row are next to each other, one slice per row.
+        slices = [order[starts[row*self.__columns+left]:
+                        starts[row*self.__columns+right+1]]
+                  for row in range(top, bottom+1)]
+        return numpy.concatenate(slices)
+
+    def collide_rect(self, rect):
+        '''This method returns a boolean array of which live bullets collide
+        with the rect parameter.'''
+
+        #Test every rect.
+        return collide(self.__rects(), rect)
+
+    def __unit_vectors(self):
+        '''This method returns the steps per degree and an array of the
+        shared unit vector table, copied again only when the table changes.'''
+
+        #Copy table into an array once per resolution.
+        steps, vectors = game_sprites.get_trig_table()
+        if self.__trig[1] is not vectors:
+            self.__trig = (steps, vectors, numpy.array(vectors, "float64"))
+        return self.__trig[0], self.__trig[2]
+
+    def add_volley(self, volley):
+        '''This method adds one bullet per degree of the volley parameter,
+        a (shooter, shoot type, list of degrees) tuple.'''
+
+        #Make room for bullets.
+        shooter, shoot_type, degs_list = volley
+        start = self.__count
+        end = start + len(degs_list)
+        if end > self.__capacity:
+            self.__grow(end)
+
+        #Bullets start at shooter, speed and direction from type and degrees.
+        fields = self.__fields
+        speed = game_sprites.BULLET_SPEEDS[shoot_type]
+        steps, vectors = self.__unit_vectors()
+        indexes = numpy.rint(numpy.asarray(degs_list, "float64")*steps)
+        vectors = vectors[indexes.astype(int) % len(vectors)] * speed
+        fields["x"][start:end] = shooter.rect.centerx
+        fields["y"][start:end] = shooter.rect.centery
+        fields["dx"][start:end] = vectors[:, 0]
+        fields["dy"][start:end] = vectors[:, 1]
+        fields["type"][start:end] = shoot_type
+        fields["grazed"][start:end] = 0
+        fields["graze_timer"][start:end] = self.__graze_frames
+        self.__count = end
+        self.__grid = None
+
+    def collide_player(self, center, hit_radius, graze_radius):
+        '''This method tests the player against all bullets in one pass.
+        Returns (True, 0) if a bullet is within the hit_radius parameter of
+        the center parameter. Otherwise every bullet within graze_radius that
+        is not grazed yet is set to grazed, returns (False, how many).'''
+
+        #Broadphase, bullets in cells near the player.
+        x_pos, y_pos = center
+        near = self.query(pygame.Rect(x_pos-graze_radius, y_pos-graze_radius,
+                                      2*graze_radius, 2*graze_radius))
+        if not len(near):
+            return False, 0
+
+        #Squared distances between circles of bullets near.
+        fields = self.__fields
+        delta_x = fields["x"][near] - x_pos
+        delta_y = fields["y"][near] - y_pos
+        distances = delta_x*delta_x + delta_y*delta_y
+        radii = self.__radii[fields["type"][near]]
+        hits = near[distances < (radii+hit_radius)**2]
+        if len(hits) and not game_sprites.get_pixel_collision():
+            return True, 0
+
+        #Circles that collide are checked pixel by pixel with the hitbox.
+        if len(hits):
+            hitbox = game_sprites.hitbox_mask(hit_radius)
+            lefts, tops = self.__rects(hits)[:2]
+            for left, top, shoot_type in zip(lefts.tolist(), tops.tolist(),
+                                             fields["type"][hits].tolist()):
+                if game_sprites.masks_collide(hitbox, (x_pos-hit_radius,
+                    y_pos-hit_radius), game_sprites.load_mask(
+                    self.__images[shoot_type]), (left, top)):
+                    return True, 0
+        grazed = fields["grazed"]
+        new = near[(distances < (radii+graze_radius)**2) &
+                   (grazed[near] == 0)]
+        grazed[new] = 1
+        return False, len(new)
+
+    def clear_bomb(self, bomb):
+        '''This method kills every bullet touching the ring of the bomb
+        parameter and returns the centers for explosions, one per grid cell.
+        '''
+
+        #Bullet circles touching the ring, between inner and outer radius,
+        #all tested at once.
+        near = self.query(bomb.rect)
+        inner, outer = bomb.get_radii()
+        x_pos, y_pos = bomb.get_center()
+        fields = self.__fields
+        xs = fields["x"][near]
+        ys = fields["y"][near]
+        distances = (xs-x_pos)**2 + (ys-y_pos)**2
+        radii = self.__radii[fields["type"][near]]
+        hits = (distances >= numpy.maximum(inner-radii, 0)**2) & \
+               (distances <= (outer+radii)**2)
+        if not hits.any():
+            return []
+
+        #One explosion per cell, the first bullet cleared in it.
+        xs = xs[hits].astype(int)
+        ys = ys[hits].astype(int)
+        cells = numpy.stack([xs//self.__cell, ys//self.__cell])
+        firsts = numpy.unique(cells, axis=1, return_index=True)[1]
+        centers = list(zip(xs[firsts].tolist(), ys[firsts].tolist()))
+
+        #Remove cleared bullets.
+        keep = numpy.ones(self.__count, bool)
+        keep[near[hits]] = False
+        self.__compact(keep)
+        return centers
+
+    def update(self):
+        '''This method moves every bullet, ticks graze timers and removes
+        bullets that left the playfield.'''
+
+        #Reposition.
+        fields = self.__fields
+        count = self.__count
+        fields["x"][:count] += fields["dx"][:count]
+        fields["y"][:count] += fields["dy"][:count]
+        self.__grid = None
+
+        #Graze reset
+        grazed = fields["grazed"][:count]
+        timers = fields["graze_timer"][:count]
+        timers[grazed == 1] -= 1
+        reset = timers == 0
+        grazed[reset] = 0
+        timers[reset] = self.__graze_frames
+
+        #Kill bullets out of playfield for efficiency, record counts.
+        inside = self.collide_rect(self.__area)
+        self.__culled = count - int(numpy.count_nonzero(inside))
+        self.__total_culled += self.__culled
+        self.__compact(inside)
+
+    def get_cull_stats(self):
+        '''This method returns the number of bullets culled in the last
+        update and in all updates as a tuple.'''
+
+        #Return instances.
+        return self.__culled, self.__total_culled
+
+    def draw(self, surface):
+        '''This method blits every live bullet on the surface parameter.'''
+
+        #Blit images at their rect positions in one batch.
+        lefts, tops = self.__rects()[:2]
+        images = [self.__images[shoot_type] for shoot_type in
+                  self.__fields["type"][:self.__count].tolist()]
+        game_sprites.blit_all(surface, list(zip(images, zip(lefts.tolist(),
+                                                            tops.tolist()))))
+
+def collide(rects, rect):
+    '''This function returns a boolean array of which of the rects
+    parameter, arrays of left, top, right and bottom sides, collide with the
+    rect parameter.'''
+
+    #Same test as pygame.Rect.colliderect.
+    lefts, tops, rights, bottoms = rects
+    return (lefts < rect.right) & (rect.left < rights) & \
+           (tops < rect.bottom) & (rect.top < bottoms)
+
+def create_enemy_bullets(screen):
+    '''This function returns the bullet engine for enemy bullets using the
+    screen parameter, or a game_sprites.Bullet_group when NumPy is missing.'''
+
+    #Fall back to sprites without NumPy.
+    if numpy is None:
+        return game_sprites.Bullet_group(screen)
+    return Bullet_engine(screen)
+
+class Bullet_budget(object):
+    '''This class bounds the number of live enemy bullets so frames stay in
+    time on slow machines. Volleys over the budget are delayed or thinned
+    depending on the policy, and bullet sounds are played once per frame.'''
+
+    def __init__(self, limit, policy = "thin", merge_sounds = True):
+        '''This method initializes the budget with the limit parameter number
+        of live bullets. The policy parameter is "delay" to hold volleys that
+        do not fit until there is room, or "thin" to fire fewer bullets of
+        them. merge_sounds plays each sound at most once per frame.'''
+
+        #Set up instances.
+        self.__limit = limit
+        self.__policy = policy
+        self.__merge_sounds = merge_sounds
+        self.__live = 0
+        self.__played = []
+        self.__degraded = 0
+        #Shooters held this frame and last frame, a volley held over many
+        #frames is delayed once.
+        self.__held = set()
+        self.__was_held = set()
+
+        #Counters of degradation.
+        self.__delayed = 0
+        self.__thinned = 0
+        self.__merged = 0
+        self.__degraded_frames = 0
+
+    def start_frame(self, live):
+        '''This method is called at the start of every frame with the live
+        parameter number of enemy bullets alive.'''
+
+        #Count frames that had to degrade.
+        if self.__degraded:
+            self.__degraded_frames += 1
+        self.__degraded = 0
+        self.__live = live
+        self.__played = []
+        self.__was_held = self.__held
+        self.__held = set()
+
+    def hold(self, shooter, size):
+        '''This method returns True if a volley of the size parameter number
+        of bullets from the shooter parameter must wait for a later frame.'''
+
+        #Hold when full, or when it does not fit under the delay policy.
+        room = self.__limit - self.__live
+        if room <= 0 or (self.__policy == "delay" and size > room):
+            #Count the volley only on the first frame it is held.
+            if shooter not in self.__was_held:
+                self.__delayed += 1
+            self.__held.add(shooter)
+            self.__degraded = 1
+            return True
+        return False
+
+    def admit(self, volley):
+        '''This method returns the volley parameter to be fired, with its
+        degrees evenly thinned out to the room left under the thin policy.'''
+
+        #Keep every few degrees so the pattern keeps its shape.
+        shooter, shoot_type, degs_list = volley
+        room = max(self.__limit - self.__live, 0)
+        if len(degs_list) > room:
+            self.__thinned += len(degs_list) - room
+            self.__degraded = 1
+            degs_list = [degs_list[index*len(degs_list)//room]
+                         for index in range(room)]
+        self.__live += len(degs_list)
+        return shooter, shoot_type, degs_list
+
+    def play(self, sound):
+        '''This method plays the sound parameter unless it was already played
+        this frame and sounds are merged.'''
+
+        #Merge sound with the one already playing.
+        if self.__merge_sounds and sound in self.__played:
+            self.__merged += 1
+            return
+        self.__played.append(sound)
+        sound.play()
+
+    def get_stats(self):
+        '''This method returns the number of delayed volleys, thinned out
+        bullets, merged sounds and frames that degraded as a tuple.'''
+
+        #Return instances.
+        return self.__delayed, self.__thinned, self.__merged, \
+               self.__degraded_frames
+
+def create_budget(enemy_bullets, policy = "thin"):
+    '''This function returns the bullet budget for the enemy_bullets
+    parameter, smaller for the sprite group, with the policy parameter.'''
+
+    #Sprites cost more per bullet than the engine.
+    if isinstance(enemy_bullets, game_sprites.Bullet_group):
+        return Bullet_budget(SPRITE_BUDGET, policy)
+    return Bullet_budget(ENGINE_BUDGET, policy)
@@ -5,7 +5,750 @@
 """
 
 #Import needed module
-import pygame, math, random
+import pygame, math, random, os, threading, mmap, struct, collections
+import patterns
+
+#Process-wide image cache shared by every sprite class. Keys are (path, mode)
+#tuples so one file may be held both converted and unconverted.
+_images = {}
+_image_stats = {"hits": 0, "misses": 0}
+
+#Every image the game uses with the mode it is converted to. Preloaded at 
+#startup so sprites never decode a PNG in the middle of a frame.
+IMAGE_MANIFEST = \
+    [("images/player"+str(index)+".png", "alpha") for index in range(5)] + \
+    [("images/player_turn"+str(index)+".png", "alpha") 
+     for index in range(5)] + \
+    [("images/fairy"+str(enemy_type)+"_"+str(index)+".png", "alpha") 
+     for enemy_type in range(1, 6) for index in range(4)] + \
+    [("images/turn"+str(enemy_type)+"_"+str(index)+".png", "alpha") 
+     for enemy_type in range(1, 4) for index in range(4)] + \
+    [("images/bullet"+str(index)+".png", "alpha") for index in range(7)] + \
+    [("images/death"+str(index)+".png", "alpha") for index in range(4)] + \
+    [("images/burst"+str(index)+".png", "alpha") for index in range(3)] + \
+    [("images/drop"+str(index)+".png", "alpha") for index in range(4)] + \
+    [("images/cloud"+str(index)+".png", "alpha") for index in range(3)] + \
+    [("images/life"+str(index)+".png", "alpha") for index in range(2)] + \
+    [("images/bomb"+str(index)+".png", "alpha") for index in range(2)] + \
+    [("images/hitbox.png", "alpha"), ("images/temp.png", "alpha"),
+     ("images/icon.png", "alpha"), ("images/paused.png", "alpha"),
+     ("images/game_over.png", "alpha"), ("images/score_tab.png", "opaque"),
+     ("images/background.png", "opaque"), ("images/title.png", "opaque")]
+
+#Optional packed archive made by build_archive.py. When present, every asset
+#is read out of this one memory-mapped file instead of the loose files.
+ARCHIVE = "data/assets.pak"
+ARCHIVE_MAGIC = b"WITCHPAK"
+_archive = {"map": None, "files": {}}
+
+class Archive_file(object):
+    '''This class is a read only file object over one file packed in the 
+    mapped archive. pygame loaders read it like a normal file, only the bytes
+    they ask for are copied out of the map.'''
+    
+    def __init__(self, mapped, offset, size):
+        '''This method initializes the file with the mapped parameter, the
+        archive map, and the offset and size of the file's bytes inside it.'''
+        
+        #Set instances.
+        self.__mapped = mapped
+        self.__offset = offset
+        self.__size = size
+        self.__position = 0
+        
+    def read(self, size=-1):
+        '''This method returns up to size bytes from the current position, or
+        the rest of the file if size is negative.'''
+        
+        #Copy only the requested bytes and move forward.
+        end = self.__size
+        if size is not None and size >= 0:
+            end = min(end, self.__position+size)
+        data = self.__mapped[self.__offset+self.__position:
+                             self.__offset+max(self.__position, end)]
+        self.__position = max(self.__position, end)
+        return data
+    
+    def seek(self, offset, whence=0):
+        '''This method moves the position by offset from the start (whence 0),
+        the current position (1) or the end of the file (2).'''
+        
+        #Relative seeks.
+        if whence == 1:
+            offset += self.__position
+        elif whence == 2:
+            offset += self.__size
+        self.__position = max(0, offset)
+        return self.__position
+    
+    def tell(self):
+        '''This method returns the current position.'''
+        
+        #Return instance.
+        return self.__position
+    
+    def close(self):
+        '''This method does nothing, the map stays open for other files.'''
+        
+        pass
+
+def open_archive(path=ARCHIVE):
+    '''This function opens the archive at path once, memory-maps it and reads
+    its table of contents. Returns True if the archive is used, False if there
+    is none and the loose files are used instead.'''
+    
+    #No archive, keep using loose files.
+    try:
+        archive = open(path, 'rb')
+    except IOError:
+        return False
+    mapped = mmap.mmap(archive.fileno(), 0, access=mmap.ACCESS_READ)
+    archive.close()
+    if mapped[:len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC:
+        raise IOError(path+" is not an asset archive")
+    
+    #Table of contents is "path<tab>offset<tab>size" lines after the header.
+    start = len(ARCHIVE_MAGIC)+4
+    toc_size = struct.unpack("<I", mapped[start-4:start])[0]
+    for line in mapped[start:start+toc_size].decode("utf-8").split("\n"):
+        if line:
+            name, offset, size = line.split("\t")
+            _archive["files"][name] = (int(offset), int(size))
+    _archive["map"] = mapped
+    return True
+
+def asset_source(path):
+    '''This function returns what pygame loaders should open for the asset 
+    file at path. An Archive_file if it is packed, otherwise the path.'''
+    
+    #File over the map if packed.
+    if path in _archive["files"]:
+        offset, size = _archive["files"][path]
+        return Archive_file(_archive["map"], offset, size)
+    return path
+
+def read_asset(path):
+    '''This function returns all bytes of the asset file at path, from the 
+    archive if packed. Raises IOError if the file does not exist.'''
+    
+    #Packed copy first.
+    if path in _archive["files"]:
+        offset, size = _archive["files"][path]
+        return _archive["map"][offset:offset+size]
+    
+    #Loose file.
+    asset = open(path, 'rb')
+    data = asset.read()
+    asset.close()
+    return data
+
+#Texture atlas made by build_atlas.py. Maps image names such as "bullet3" to
+#subsurface views of the one decoded atlas image.
+ATLAS_IMAGE = "images/atlas.png"
+ATLAS_INDEX = "images/atlas.txt"
+_atlas = {}
+
+def read_atlas_index(index_path=ATLAS_INDEX):
+    '''This function reads the atlas index file at index_path and returns a
+    dictionary of image names to (x, y, width, height) rects. The dictionary 
+    is empty if there is no atlas.'''
+    
+    #No index, no packed images.
+    try:
+        lines = read_asset(index_path).decode("ascii").split("\n")
+    except IOError:
+        return {}
+    
+    #One "name x y width height" line per image.
+    rects = {}
+    for line in lines:
+        if line.strip():
+            name, x_pos, y_pos, width, height = line.split()
+            rects[name] = (int(x_pos), int(y_pos), int(width), int(height))
+    return rects
+
+def load_atlas(path=ATLAS_IMAGE, index_path=ATLAS_INDEX, image=None):
+    '''This function converts the atlas image at path once and maps every name
+    in the index file to a subsurface of it. The image parameter is the 
+    already decoded atlas, if None it is decoded here. If there is no atlas 
+    the loose image files are used instead. Needs the display mode set.'''
+    
+    #No index, keep using loose files.
+    rects = read_atlas_index(index_path)
+    if not rects:
+        return
+    
+    #Convert once, every packed image is a view into it.
+    if image is None:
+        image = pygame.image.load(asset_source(path), path)
+    atlas = image.convert_alpha()
+    for name in rects:
+        _atlas[name] = atlas.subsurface(rects[name])
+
+def atlas_image(name):
+    '''This function returns the atlas subsurface of the image name parameter, 
+    for example "bullet3" or "fairy2_1".'''
+    
+    #Return view.
+    return _atlas[name]
+
+def image_name(path):
+    '''This function returns the atlas name of the image file at path, its 
+    file name without the extension.'''
+    
+    #Strip folder and extension.
+    return os.path.splitext(os.path.basename(path))[0]
+
+def store_image(path, mode, image):
+    '''This function converts the decoded image parameter according to mode 
+    and saves it in the image cache as the image file at path, unless the 
+    file is already there. Returns the cached surface.'''
+    
+    #Keep the first stored copy, sprites may already share it.
+    key = (path, mode)
+    if key in _images:
+        return _images[key]
+    
+    #Convert for fast blitting, "raw" images are kept as decoded.
+    if mode == "alpha":
+        image = image.convert_alpha()
+    elif mode == "opaque":
+        image = image.convert()
+    _images[key] = image
+    return image
+
+def load_image(path, mode="alpha"):
+    '''This function returns the shared surface for the image file at path. The
+    mode parameter decides the conversion, "alpha" for convert_alpha, "opaque"
+    for convert and "raw" for none. The file is only decoded on the first call,
+    so the returned surface must never be drawn on, copy it first.'''
+    
+    #Return cached surface if already loaded.
+    key = (path, mode)
+    if key in _images:
+        _image_stats["hits"] += 1
+        return _images[key]
+    
+    #Use the atlas view if packed, otherwise decode and convert image. Then
+    #save it for later calls.
+    _image_stats["misses"] += 1
+    name = image_name(path)
+    if mode == "alpha" and name in _atlas:
+        _images[key] = _atlas[name]
+        return _atlas[name]
+    return store_image(path, mode, pygame.image.load(asset_source(path), 
+                                                     path))
+
+def preload_images(manifest):
+    '''This function loads every (path, mode) pair in the manifest parameter 
+    into the image cache. Needs the display mode to be set first.'''
+    
+    #Load each image, cached images are skipped by load_image.
+    for path, mode in manifest:
+        load_image(path, mode)
+
+def get_image_stats():
+    '''This function returns the hits and misses of the image cache as a 
+    tuple. Used to check that no image is decoded during the game.'''
+    
+    #Return cache counters.
+    return _image_stats["hits"], _image_stats["misses"]
+
+#Collision masks of shared images, keyed by the image surface itself, and 
+#if pixel accurate collision is used after the rect and circle tests. Off by
+#default, set_pixel_collision turns it on.
+_masks = {}
+_pixel_collision = {"on": 0}
+
+def load_mask(image):
+    '''This function returns the collision mask of the image parameter, a 
+    shared image. The mask is only built the first time.'''
+    
+    #Build once per image.
+    if image not in _masks:
+        _masks[image] = pygame.mask.from_surface(image)
+    return _masks[image]
+
+def preload_masks(images):
+    '''This function builds the masks of every image of the images 
+    parameter ahead of time, so none is built during the game.'''
+    
+    #Fill mask cache.
+    for image in images:
+        load_mask(image)
+
+def hitbox_mask(radius):
+    '''This function returns the mask of a filled circle of the radius 
+    parameter, the actual size of the hitbox.'''
+    
+    #Build once per radius.
+    key = ("hitbox", radius)
+    if key not in _masks:
+        mask = pygame.mask.Mask((2*radius+1, 2*radius+1))
+        for x_pos in range(2*radius+1):
+            for y_pos in range(2*radius+1):
+                if (x_pos-radius)**2 + (y_pos-radius)**2 <= radius**2:
+                    mask.set_at((x_pos, y_pos), 1)
+        _masks[key] = mask
+    return _masks[key]
+
+def set_pixel_collision(mode):
+    '''This function turns pixel accurate collision on or off depending on
+    the mode parameter (boolean). Off, the rect and circle tests decide.'''
+    
+    #Set mode.
+    _pixel_collision["on"] = mode
+
+def get_pixel_collision():
+    '''This function returns if pixel accurate collision is on.'''
+    
+    #Return mode.
+    return _pixel_collision["on"]
+
+def masks_collide(mask, position, other_mask, other_position):
+    '''This function returns True if the mask parameter at the position 
+    parameter (top left) overlaps other_mask at other_position.'''
+    
+    #Overlap is checked relative to the first mask.
+    offset = (int(other_position[0]-position[0]), 
+              int(other_position[1]-position[1]))
+    return mask.overlap(other_mask, offset) != None
+
+#Animation frame sets shared by sprite instances, keyed by (prefix, count, 
+#flip). Built once so spawning a sprite needs no loading or flipping.
+_frame_sets = {}
+
+def load_frames(prefix, count, flip=0):
+    '''This function returns the shared tuple of count animation frames named
+    prefix+index+".png". The flip parameter (boolean) mirrors every frame 
+    horizontally, used for the opposite turning direction.'''
+    
+    #Build frame set only if not cached yet.
+    key = (prefix, count, flip)
+    if key not in _frame_sets:
+        frames = []
+        for index in range(count):
+            frame = load_image(prefix+str(index)+".png")
+            if flip:
+                frame = pygame.transform.flip(frame, 1, 0)
+            frames.append(frame)
+        _frame_sets[key] = tuple(frames)
+        
+    #Return shared frames.
+    return _frame_sets[key]
+
+def load_enemy_frames(enemy_type):
+    '''This function returns the shared (unlocked, locked right, locked left) 
+    frame sets of the enemy_type parameter. Only boss types (1-3) have turning
+    frames, common types get empty locked sets.'''
+    
+    #Fairy frames for every type.
+    unlock_frames = load_frames("images/fairy"+str(enemy_type)+"_", 4)
+    
+    #Right turning frames from files, left by fliping them.
+    if enemy_type < 4:
+        turn = "images/turn"+str(enemy_type)+"_"
+        return unlock_frames, load_frames(turn, 4), load_frames(turn, 4, 1)
+    return unlock_frames, (), ()
+
+#Sound bank shared by every screen, each effect is decoded once.
+_sounds = {}
+
+#Volume of every sound effect, applied once when the effect is decoded.
+SOUND_VOLUMES = {"sounds/select.ogg": 0.3, "sounds/ok.ogg": 0.3,
+                 "sounds/reset.ogg": 0.3, "sounds/pause.ogg": 0.3,
+                 "sounds/player_death.ogg": 0.3, 
+                 "sounds/player_shoot.ogg": 0.1, "sounds/graze.ogg": 0.3,
+                 "sounds/point.ogg": 0.3, "sounds/enemy_death.ogg": 0.4,
+                 "sounds/get_life.ogg": 0.4, "sounds/get_bomb.ogg": 0.4,
+                 "sounds/bomb.ogg": 0.4, "sounds/bullet1.ogg": 0.1,
+                 "sounds/bullet2.ogg": 0.1, "sounds/bullet3.ogg": 0.1,
+                 "sounds/bullet4.ogg": 0.1, "sounds/bullet5.ogg": 0.1}
+
+#Volume of the streamed music tracks.
+MUSIC_VOLUMES = {"sounds/main_menu.ogg": 0.3, "sounds/background.ogg": 0.2}
+
+def store_sound(path, sound):
+    '''This function sets the volume of the decoded sound parameter from 
+    SOUND_VOLUMES and saves it in the sound bank as the file at path, unless 
+    the file is already there. Returns the banked sound.'''
+    
+    #Keep the first decoded copy.
+    if path not in _sounds:
+        sound.set_volume(SOUND_VOLUMES.get(path, 1.0))
+        _sounds[path] = sound
+    return _sounds[path]
+
+def load_sound(path):
+    '''This function returns the shared Sound object for the file at path with
+    its volume from SOUND_VOLUMES already set. The file is only decoded on the
+    first call.'''
+    
+    #Return shared sound, decode it if not in the bank yet.
+    if path in _sounds:
+        return _sounds[path]
+    return store_sound(path, pygame.mixer.Sound(asset_source(path)))
+
+def preload_sounds(paths):
+    '''This function decodes every sound file in the paths parameter into the
+    sound bank. Called once at startup.'''
+    
+    #Load each sound, loaded sounds are skipped by load_sound.
+    for path in paths:
+        load_sound(path)
+
+def play_music(path):
+    '''This function streams the music file at path on loop with its volume 
+    from MUSIC_VOLUMES.'''
+    
+    #Load, set volume and loop forever.
+    #Name hint only for packed files, older pygame takes just a path.
+    source = asset_source(path)
+    if isinstance(source, Archive_file):
+        pygame.mixer.music.load(source, path)
+    else:
+        pygame.mixer.music.load(path)
+    pygame.mixer.music.set_volume(MUSIC_VOLUMES.get(path, 1.0))
+    pygame.mixer.music.play(-1)
+
+#Fonts shared by every text sprite, keyed by (path, size).
+_fonts = {}
+
+def load_font(path, size):
+    '''This function returns the shared Font object for the font file at path
+    in the size parameter. Each (path, size) pair is only parsed once.'''
+    
+    #Parse font only if not cached yet.
+    key = (path, size)
+    if key not in _fonts:
+        _fonts[key] = pygame.font.Font(asset_source(path), size)
+        
+    #Return shared font.
+    return _fonts[key]
+
+#Rendered text shared by every text sprite, least recently used first. Keys 
+#are (path, size, text, antialias, colour), the budget is in bytes.
+_texts = collections.OrderedDict()
+_text_stats = {"budget": 1024*1024, "bytes": 0, "hits": 0, "misses": 0}
+
+def surface_bytes(surface):
+    '''This function returns the bytes of pixel memory used by the surface 
+    parameter.'''
+    
+    #Row length times rows.
+    return surface.get_pitch()*surface.get_height()
+
+def set_text_budget(budget):
+    '''This function sets the byte budget of the rendered text cache to the 
+    budget parameter, dropping least recently used text that no longer fits.'''
+    
+    #Set budget and evict, the newest text is always kept.
+    _text_stats["budget"] = budget
+    while _text_stats["bytes"] > budget and len(_texts) > 1:
+        key, surface = _texts.popitem(last=False)
+        _text_stats["bytes"] -= surface_bytes(surface)
+
+def render_text(path, size, text, antialias, colour):
+    '''This function returns the shared surface of the text parameter rendered
+    with the font at path in size, with antialias (boolean) and colour. It is 
+    only rendered on the first call while it fits in the text budget, so the 
+    returned surface must never be drawn on.'''
+    
+    #Return cached text, marking it as most recently used.
+    key = (path, size, text, antialias, colour)
+    if key in _texts:
+        _text_stats["hits"] += 1
+        surface = _texts.pop(key)
+        _texts[key] = surface
+        return surface
+    
+    #Render with the shared font, then evict down to budget.
+    _text_stats["misses"] += 1
+    surface = load_font(path, size).render(text, antialias, colour)
+    _texts[key] = surface
+    _text_stats["bytes"] += surface_bytes(surface)
+    set_text_budget(_text_stats["budget"])
+    return surface
+
+def get_text_stats():
+    '''This function returns the hits, misses, hit rate (0.0 to 1.0) and bytes
+    used of the rendered text cache as a tuple.'''
+    
+    #Hit rate of all lookups so far.
+    hits, misses = _text_stats["hits"], _text_stats["misses"]
+    rate = 0.0
+    if hits+misses:
+        rate = float(hits)/(hits+misses)
+    return hits, misses, rate, _text_stats["bytes"]
+
+#Font of the score tab with the text it draws in its white and flash colours.
+SCORE_FONT = ("fonts/go3v2.ttf", 25)
+SCORE_COLOURS = [(255,255,255), (255,99,71)]
+SCORE_GLYPHS = list("0123456789") + ["HIGHSCORE", "SCORE", "LIVES", "BOMBS"]
+
+def preload_score_glyphs():
+    '''This function parses the score tab font and renders every glyph it
+    draws into the text cache, so a new game does not render them.'''
+    
+    #Render each glyph in each colour.
+    path, size = SCORE_FONT
+    for colour in SCORE_COLOURS:
+        for text in SCORE_GLYPHS:
+            render_text(path, size, text, 1, colour)
+
+class Asset_loader(threading.Thread):
+    '''This class decodes the images and sounds of the game on a worker thread
+    while the title screen is already running. Decoded files are handed to 
+    the shared caches on the main thread by poll, where images are converted 
+    for the display.'''
+    
+    def __init__(self, image_manifest, sound_paths):
+        '''This method initializes the loader with the (path, mode) pairs of
+        the image_manifest parameter and the sound_paths parameter. Files that
+        are already cached or packed in the atlas are not decoded again.'''
+        
+        # Call the parent __init__() method
+        threading.Thread.__init__(self)
+        
+        #Worker must not keep the game open on exit.
+        self.daemon = True
+        
+        #Tasks are (kind, path, extra) tuples. Atlas first, its images are 
+        #then views into it instead of separate files.
+        rects = read_atlas_index()
+        self.__tasks = []
+        if rects and not _atlas:
+            self.__tasks.append(("atlas", ATLAS_IMAGE, None))
+        for path, mode in image_manifest:
+            if (path, mode) not in _images and not (mode == "alpha" and 
+                                                    image_name(path) in rects):
+                self.__tasks.append(("image", path, mode))
+        for path in sound_paths:
+            if path not in _sounds:
+                self.__tasks.append(("sound", path, None))
+        
+        #Set other instances.
+        self.__manifest = image_manifest
+        self.__decoded = []
+        self.__stored = 0
+        self.__error = None
+        self.__done = 0
+    
+    def run(self):
+        '''This method runs on the worker thread. It decodes every task in 
+        order without converting, the results are picked up by poll.'''
+        
+        #Decode, keep the error to raise it on the main thread.
+        try:
+            for kind, path, extra in self.__tasks:
+                if kind == "sound":
+                    self.__decoded.append(pygame.mixer.Sound(
+                        asset_source(path)))
+                else:
+                    self.__decoded.append(pygame.image.load(
+                        asset_source(path), path))
+        except Exception as error:
+            self.__error = error
+    
+    def poll(self):
+        '''This method is called once per frame on the main thread. It stores
+        everything decoded since the last call in the shared caches and returns
+        the progress from 0.0 to 1.0. At 1.0 every asset is resident.'''
+        
+        #Raise worker errors here, the game can not start without assets.
+        if self.__error:
+            raise self.__error
+        
+        #Store newly decoded files.
+        while self.__stored < len(self.__decoded):
+            kind, path, extra = self.__tasks[self.__stored]
+            decoded = self.__decoded[self.__stored]
+            if kind == "atlas":
+                load_atlas(image=decoded)
+            elif kind == "image":
+                store_image(path, extra, decoded)
+            elif kind == "sound":
+                store_sound(path, decoded)
+            self.__stored += 1
+        
+        #Once all is stored, fill the cache from atlas views, build the 
+        #fliped enemy frames and render the score tab text.
+        if self.__stored == len(self.__tasks) and not self.__done:
+            preload_images(self.__manifest)
+            for enemy_type in range(1, 6):
+                for frames in load_enemy_frames(enemy_type):
+                    preload_masks(frames)
+            preload_masks([load_image("images/bullet"+str(shoot_type)+".png")
+                           for shoot_type in range(len(BULLET_SPEEDS))])
+            preload_score_glyphs()
+            self.__done = 1
+        
+        #Return progress.
+        if self.__done:
+            return 1.0
+        return float(self.__stored)/len(self.__tasks)
+    
+    def get_done(self):
+        '''This method returns the done instance (boolean). True when every 
+        asset is resident and the game can start.'''
+        
+        #Return instance.
+        return self.__done
+
+#Unit vectors of every direction, steps per degree and the table itself.
+_trig = {"steps":0, "vectors":[]}
+
+def set_trig_resolution(steps):
+    '''This function builds the shared unit vector table with the steps
+    parameter number of directions per degree. 1 covers the integer degrees
+    patterns are built from, more steps give finer aim.'''
+
+    #Screen coordinates, y goes down so sin is negated.
+    vectors = []
+    for index in range(360*steps):
+        rads = math.radians(float(index)/steps)
+        vectors.append((math.cos(rads), -math.sin(rads)))
+    _trig["steps"] = steps
+    _trig["vectors"] = vectors
+
+def unit_vector(degs):
+    '''This function returns the (dx, dy) unit vector in screen coordinates
+    of the degs parameter direction from the shared table, rounded to its
+    resolution.'''
+
+    #Look up nearest direction, any degrees wrap around.
+    steps = _trig["steps"]
+    return _trig["vectors"][int(round(degs*steps)) % (360*steps)]
+
+def velocities(degs_list, speeds):
+    '''This function returns a list of (dx, dy) velocities, one per degree of
+    the degs_list parameter. The speeds parameter is one speed for all or a
+    list of one speed per degree.'''
+
+    #Same speed for all when only one is given.
+    if not isinstance(speeds, (list, tuple)):
+        speeds = [speeds] * len(degs_list)
+
+    #Scale the unit vector of every direction.
+    vectors = _trig["vectors"]
+    steps = _trig["steps"]
+    size = 360*steps
+    result = []
+    for degs, speed in zip(degs_list, speeds):
+        unit_x, unit_y = vectors[int(round(degs*steps)) % size]
+        result.append((unit_x*speed, unit_y*speed))
+    return result
+
+def get_trig_table():
+    '''This function returns the steps per degree and the list of (dx, dy)
+    unit vectors of the shared table, used to look up many at once.'''
+
+    #Return table.
+    return _trig["steps"], _trig["vectors"]
+
+#Whole degrees by default.
+set_trig_resolution(1)
+
+class Sprite_pool(object):
+    '''This class keeps killed sprites of one class to be reset and reused
+    instead of creating new ones. Used for short lived sprites such as
+    bullets, explosions and pick ups.'''
+
+    def __init__(self, sprite_class):
+        '''This method initializes the pool using the sprite_class parameter,
+        a Pooled_sprite class with a reset method taking the same parameters
+        as its __init__ method.'''
+
+        #Set up instances.
+        self.__sprite_class = sprite_class
+        self.__free = []
+        self.__capacity = 0
+        self.__in_use = 0
+        self.__high_water = 0
+
+    def acquire(self, *args):
+        '''This method returns a free sprite reset with the parameters passed
+        in, or a new sprite if no sprite is free.'''
+
+        #Reuse free sprite, or grow the pool.
+        if self.__free:
+            sprite = self.__free.pop()
+            sprite.reset(*args)
+        else:
+            sprite = self.__sprite_class(*args)
+            self.__capacity += 1
+        sprite.set_pool(self)
+
+        #Record in use count.
+        self.__in_use += 1
+        self.__high_water = max(self.__high_water, self.__in_use)
+        return sprite
+
+    def release(self, sprite):
+        '''This method takes back the sprite parameter once it is killed.'''
+
+        #Free the sprite.
+        self.__free.append(sprite)
+        self.__in_use -= 1
+
+    def get_stats(self):
+        '''This method returns the capacity (sprites created), in use and
+        high water mark (most in use at once) of the pool as a tuple.'''
+
+        #Return instances.
+        return self.__capacity, self.__in_use, self.__high_water
+
+class Pooled_sprite(pygame.sprite.Sprite):
+    '''This class is a sprite that goes back to its Sprite_pool when it is
+    killed. Subclasses set themselves up in a reset method.'''
+
+    def __init__(self):
+        '''This method initializes the sprite without a pool, set by the pool
+        that acquires it.'''
+
+        # Call the parent __init__() method
+        pygame.sprite.Sprite.__init__(self)
+
+        #No pool until acquired.
+        self.__pool = None
+
+    def set_pool(self, pool):
+        '''This method sets the pool instance the sprite is in use from.'''
+
+        #Set instance.
+        self.__pool = pool
+
+    def kill(self):
+        '''This method removes the sprite from all groups and releases it to
+        its pool once, even if it is killed again.'''
+
+        #Kill, then release if in use.
+        pygame.sprite.Sprite.kill(self)
+        if self.__pool:
+            pool = self.__pool
+            self.__pool = None
+            pool.release(self)
+
+#Pools of short lived sprites by class.
+_pools = {}
+
+def acquire(sprite_class, *args):
+    '''This function returns a sprite of the sprite_class parameter from its
+    shared pool, set up with the other parameters passed in.'''
+
+    #Create pool on first use.
+    if sprite_class not in _pools:
+        _pools[sprite_class] = Sprite_pool(sprite_class)
+    return _pools[sprite_class].acquire(*args)
+
+def get_pool_stats(sprite_class):
+    '''This function returns the capacity, in use and high water mark of the
+    pool of the sprite_class parameter as a tuple.'''
+
+    #Empty stats if never used.
+    if sprite_class not in _pools:
+        return 0, 0, 0
+    return _pools[sprite_class].get_stats()
 
 class Button(pygame.sprite.Sprite):
     '''This is the button class where button sprites are created. The button 
@@ -21,12 +764,16 @@ class Button(pygame.sprite.Sprite):
         # Call the parent __init__() method
         pygame.sprite.Sprite.__init__(self)
         
-        self.__message = message
-        self.__font = pygame.font.Font("fonts/Segoe Script Bold.ttf", 25)
         self.__select = 0
+        self.__shown = 0
         self.__colours = [colour, (255,99,71)]
-        self.image = self.__font.render(
-            message, 1, (self.__colours[self.__select]))
+        
+        #Normal and selected labels, rendered once and shared by all buttons.
+        self.__labels = []
+        for label_colour in self.__colours:
+            self.__labels.append(render_text("fonts/Segoe Script Bold.ttf", 
+                                             25, message, 1, label_colour))
+        self.image = self.__labels[self.__select]
         self.rect = self.image.get_rect()
         self.rect.center = xy_pos
     
@@ -41,9 +788,10 @@ class Button(pygame.sprite.Sprite):
         '''This method run automatically called every frame to determine if the 
         button should change colour depending on if it is selected.'''
         
-        #Reset colour of label depending on if selected.
-        self.image = self.__font.render(
-            self.__message, 1, (self.__colours[self.__select]))
+        #Switch label only if selection changed since last shown.
+        if self.__select != self.__shown:
+            self.__shown = self.__select
+            self.image = self.__labels[self.__select]
         
         #Reset, it will be 1 if it is still selected next frame.
         self.__select = 0
@@ -59,25 +807,14 @@ class Player(pygame.sprite.Sprite):
         # Call the parent __init__() method
         pygame.sprite.Sprite.__init__(self)
         
-        #Set up and load images for animation frames while idle
-        self.__station_frames = []
-        for index in range(5):
-            self.__station_frames.append(pygame.image.load("images/player"
-                +str(index)+".png").convert_alpha())
-        
-        #Load images for animation while turning.
-        self.__turn_frames_left = []
-        for index in range(5):
-            self.__turn_frames_left.append(pygame.image.load(
-                "images/player_turn"+str(index)+".png").convert_alpha())   
-        
-        #Fliped all left turn frames for right turning animation frames.
-        self.__turn_frames_right = []
-        for frame in self.__turn_frames_left:
-            self.__turn_frames_right.append(pygame.transform.flip(frame, 1,0))
+        #Shared animation frames while idle and turning. Right turning frames
+        #are the left ones fliped.
+        self.__station_frames = load_frames("images/player", 5)
+        self.__turn_frames_left = load_frames("images/player_turn", 5)
+        self.__turn_frames_right = load_frames("images/player_turn", 5, 1)
             
         #Invisible image, used when invincible
-        self.__temp = pygame.image.load("images/temp.png").convert_alpha()
+        self.__temp = load_image("images/temp.png")
 
         #Set other instances needed for this class.
         self.__frames = self.__station_frames
@@ -162,15 +899,12 @@ class Player(pygame.sprite.Sprite):
         #appropriate cool rate.
         if not self.__focus == 1:
             self.__temp_cool_rate = self.__cool_rate
-            return Bullet(self.__screen, self, 0)
+            return acquire(Bullet, self, 0)
         #Unfocused shoots muti-bullets. Resetting with appropriate cool rate.
         else:
             self.__temp_cool_rate = self.__focus_cool_rate
-            return [Bullet(self.__screen, self, 1, 60),
-                    Bullet(self.__screen, self, 1, 75),
-                    Bullet(self.__screen, self, 1, 90),
-                    Bullet(self.__screen, self, 1, 105),
-                    Bullet(self.__screen, self, 1, 120)]
+            return [acquire(Bullet, self, 1, degs) 
+                    for degs in range(60, 121, 15)]
         
     def reset(self):
         '''This method resets the player to original spawn point. Set up for 
@@ -299,9 +1033,8 @@ class Hitbox(pygame.sprite.Sprite):
         pygame.sprite.Sprite.__init__(self)
         
         #Image loading
-        self.__hitbox = pygame.image.load("images/hitbox.png")\
-            .convert_alpha()
-        self.__temp = pygame.image.load("images/temp.png").convert_alpha()
+        self.__hitbox = load_image("images/hitbox.png")
+        self.__temp = load_image("images/temp.png")
         
         #Instance value setting.
         self.image = self.__hitbox
@@ -341,6 +1074,9 @@ class Bomb(pygame.sprite.Sprite):
     '''This class creates a player bomb sprite. Used to detect and kill bullets
     upon detection.'''
     
+    #Expanding ring frames shared by every bomb, keyed by (side, width).
+    __frames = {}
+    
     def __init__(self, xy_position):
         '''This method initializes the class using the xy parameter 
         (tuple position) to start bomb at a point.'''
@@ -358,12 +1094,42 @@ class Bomb(pygame.sprite.Sprite):
         self.__expand = 30
         self.__width = 3
         
-    def get_side(self):
-        '''This method returns the instance side. Used in accurate rect 
-        detection in main.'''
+    def get_center(self):
+        '''This method returns the start position the bomb expands from.'''
         
         #Return instance.
-        return self.__side
+        return self.__start
+    
+    def get_radii(self):
+        '''This method returns the inner and outer radius of the ring that 
+        clears bullets. A small bomb clears its whole area, a big one only 
+        its rim, the outer quarter of its radius.'''
+        
+        #Whole area while small.
+        if self.__side <= 140:
+            return 0, self.__side/2.0
+        return self.__side*3/8.0, self.__side/2.0
+    
+    def get_frame(self):
+        '''This method returns the ring frame for the current side and width. 
+        A frame is only drawn the first time any bomb reaches it.'''
+        
+        #Draw frame if not cached yet.
+        key = (self.__side, self.__width)
+        if key not in Bomb.__frames:
+            frame = pygame.Surface((self.__side,self.__side)).convert()
+            
+            #Make background invisible. RLE keeps only the ring pixels once 
+            #blitted, so the empty inside is free to store and to blit.
+            frame.set_colorkey((0,0,0), pygame.RLEACCEL)
+            
+            #Draw circle in surface.
+            pygame.draw.circle(frame, (255,255,255), (self.__side//2
+                                , self.__side//2), self.__side//2, self.__width)
+            Bomb.__frames[key] = frame
+            
+        #Return shared frame.
+        return Bomb.__frames[key]
 
     def update(self):
         ''''This method updates the bomb by increasing the size, the width of 
@@ -375,15 +1141,8 @@ class Bomb(pygame.sprite.Sprite):
             self.__side += self.__expand
             self.__width += 1
             
-            #Create new surface with the new size
-            self.image = pygame.Surface((self.__side,self.__side))
-            
-            #Make background invisible
-            self.image.set_colorkey((0,0,0))
-            
-            #Draw circle in surface.
-            pygame.draw.circle(self.image, (255,255,255), (self.__side//2
-                                , self.__side//2), self.__side//2, self.__width)
+            #Use the shared frame of the new size.
+            self.image = self.get_frame()
             
             #Reset rect for proper collision.
             self.rect = self.image.get_rect()
@@ -405,40 +1164,20 @@ class Enemy(pygame.sprite.Sprite):
         # Call the parent __init__() method
         pygame.sprite.Sprite.__init__(self)
         
-        #Set up and load animation frames.
-        self.__unlock_frames = []
-        for index in range(4):
-            self.__unlock_frames.append(pygame.image.load("images/fairy"
-                +str(enemy_type)+"_"+str(index)+".png").convert_alpha())
-        
-        #Load frames of turning animation for boss type enemies.
-        self.__lock_frames_right = []
-        self.__lock_frames_left = []   
-        if enemy_type < 4:
-            #Create right turning frames from image files.
-            for index in range(4):
-                self.__lock_frames_right.append(pygame.image.load("images/turn"
-                    +str(enemy_type)+"_"+str(index)+".png").convert_alpha())
-            
-            #Left turning frames created by fliping right turning frames
-            for frame in self.__lock_frames_right:
-                self.__lock_frames_left.append(pygame.transform.flip(frame,
-                                                                     1, 0))        
+        #Shared animation frames, turning frames only for boss type enemies.
+        self.__unlock_frames, self.__lock_frames_right, \
+            self.__lock_frames_left = load_enemy_frames(enemy_type)
             
         #Setting default properites
         self.__frames = self.__unlock_frames
         self.image = self.__frames[0]
-        self.__down_frames = 0
-        self.__active_frames = 0
-        self.__cool_rate = 0
         self.__dx = 0
         self.__dy = 0
-        self.__hp = 0
-        self.__degs_change = 0     
         self.rect = self.image.get_rect()
         self.rect.center = (400-50*enemy_type, 340-50*enemy_type)
         self.__screen = screen        
-        self.__target_degs = None
+        self.__pattern = patterns.enemy_pattern(enemy_type)
+        self.__pattern_state = patterns.new_state(self.__pattern)
         self.__target_y = screen.get_height()+self.rect.height
         self.__enemy_type = enemy_type
         self.__index = 0
@@ -447,33 +1186,11 @@ class Enemy(pygame.sprite.Sprite):
         self.__lock = 0
         self.__killed  = 0
         
-        #Setting special enemy instance values depending on enemy type.
-        if enemy_type == 1:
-            self.__down_frames = 60
-            self.__active_frames = 60
-            self.__cool_rate = 5
-            self.__hp = 35
-        elif enemy_type == 2:
-            self.__down_frames = 30
-            self.__active_frames = 40
-            self.__cool_rate = 10
-            self.__hp = 40  
-        elif enemy_type == 3:
-            self.__down_frames = 0
-            self.__active_frames = 12
-            self.__cool_rate = 4
-            self.__hp = 45
-            self.__degs_change = 6
-        elif enemy_type == 4:
-            self.__down_frames = 60
-            self.__active_frames = 15
-            self.__cool_rate = 3
-            self.__hp = 10 
-        elif enemy_type == 5:
-            self.__down_frames = 30
-            self.__active_frames = 30
-            self.__cool_rate = 15
-            self.__hp = 15              
+        #Setting special enemy instance values from its compiled pattern.
+        self.__down_frames = self.__pattern["down_frames"]
+        self.__active_frames = self.__pattern["active_frames"]
+        self.__cool_rate = self.__pattern["cool_rate"]
+        self.__hp = self.__pattern["hp"]
         
         #Set up initial spawn position
         self.setup()
@@ -494,6 +1211,10 @@ class Enemy(pygame.sprite.Sprite):
         y_pos = 0-self.rect.height
         self.rect.center = (x_pos, y_pos)
         
+        #Exact position, the rect is only moved to whole pixels of it.
+        self.__x = float(x_pos)
+        self.__y = float(y_pos)
+        
         #Static target position for boss type sprites.
         if self.__enemy_type < 4:
             target_x = random.randrange(100, 
@@ -504,8 +1225,7 @@ class Enemy(pygame.sprite.Sprite):
             #Get the degrees between the target position and starting position.
             degs = self.calc_degs(target_x,target_y)
             #Get the appropriate vector movement according to degrees.
-            self.__dx = math.cos(math.radians(degs)) * 5
-            self.__dy = -(math.sin(math.radians(degs)) * 5)   
+            self.__dx, self.__dy = velocities([degs], 5)[0]
             
             #Save the target y position.
             self.__target_y = target_y
@@ -520,82 +1240,21 @@ class Enemy(pygame.sprite.Sprite):
             if x_pos > (self.__screen.get_width()-200)/2:
                 self.__dx = -self.__dx
         
-    def spawn_bullet(self, target):
+    def spawn_volley(self, target):
         '''This method accepts a target parameter (a sprite) and use it to 
-        spawn/return bullets. The pattern will vary depending on the enemy 
-        types.'''
+        aim a volley of bullets. The pattern will vary depending on the enemy 
+        types. Returns a (shooter, shoot type, list of degrees) tuple that the
+        enemy bullet group or engine turns into bullets.'''
         
         #Get degrees using the target and the shooter.
         degs = self.calc_degs(target.rect.centerx, target.rect.centery) 
         
-        #Type 1, fire 1 bullet that tracks in the direction of the target 
-        #with some variation.
-        if self.__enemy_type == 1:
-            self.__target_degs = degs
-            vary = random.randrange(-10, 26, 2)
-            self.__target_degs += vary
-            self.__temp_cool_rate = self.__cool_rate
-            return Bullet(self.__screen, self, self.__enemy_type+1,
-                          self.__target_degs) 
-        
-        #Type 2, fire three bullets in a triple spread pattern towards target 
-        #with little variation.
-        elif self.__enemy_type == 2:
-            if self.__target_degs == None:
-                self.__target_degs = degs
-                vary = random.randrange(-2, 12, 2)
-                self.__target_degs += vary                 
-            self.__temp_cool_rate = self.__cool_rate              
-            return [Bullet(self.__screen, self, self.__enemy_type+1, 
-                           self.__target_degs-50), 
-                    Bullet(self.__screen, self, 
-                           self.__enemy_type+1, self.__target_degs-25),
-                    Bullet(self.__screen, self, self.__enemy_type+1,
-                           self.__target_degs),
-                    Bullet(self.__screen, self, self.__enemy_type+1,
-                                               self.__target_degs+25),
-                    Bullet(self.__screen, self, self.__enemy_type+1,
-                                               self.__target_degs+55)]
-        
-        #Type 3, Fire four bullets in a 90 degree gap each. The degree of 
-        #direction will change and rotate as frames pass by.
-        elif self.__enemy_type == 3:
-            if self.__target_degs == None:
-                self.__target_degs = 0
-            factor = random.randrange(1,4,2)
-            if self.__target_degs < 0 and self.__degs_change < 0:
-                self.__degs_change = 9 * factor
-            elif self.__target_degs > 180 and self.__degs_change > 0:
-                self.__degs_change = -9 * factor
-            self.__target_degs += self.__degs_change
-            self.__temp_cool_rate = self.__cool_rate              
-            return [Bullet(self.__screen, self, self.__enemy_type+1,
-                           self.__target_degs),
-                   Bullet(self.__screen, self, self.__enemy_type+1,
-                          self.__target_degs+90),
-                   Bullet(self.__screen, self, self.__enemy_type+1,
-                          self.__target_degs+180),
-                   Bullet(self.__screen, self, self.__enemy_type+1,
-                          self.__target_degs+270)]
-        
-        #Type 4, fire at target will a lot of variation in direction.
-        elif self.__enemy_type == 4:
-            self.__target_degs = degs
-            vary = random.randrange(-16, 30, 1)
-            self.__target_degs += vary                 
-            self.__temp_cool_rate = self.__cool_rate              
-            return Bullet(self.__screen, self, self.__enemy_type+1, 
-                           self.__target_degs)     
-        
-        #Type 5, spread bullets in all directions, 60 degrees gap.
-        elif self.__enemy_type == 5:
-            self.__target_degs = random.randrange(0, 360, 15)
-            bullets = []
-            for extra_degs in range(0, 360, 60):
-                bullets.append(Bullet(self.__screen, self, self.__enemy_type+1, 
-                    self.__target_degs+extra_degs))             
-            self.__temp_cool_rate = self.__cool_rate     
-            return bullets
+        #Reset cool down, all degrees of the volley come from the pattern.
+        self.__temp_cool_rate = self.__cool_rate
+        volley = patterns.volley(self.__pattern, degs, self.__pattern_state)
+        
+        #Bullet type is one above enemy type.
+        return self, self.__enemy_type+1, volley
             
     def calc_degs(self, target_x, target_y):
         '''This method accepts the target's x and y coordinates to get the 
@@ -671,6 +1330,13 @@ class Enemy(pygame.sprite.Sprite):
         #Return instance.
         return self.rect.center
     
+    def get_volley_size(self):
+        '''This method returns the number of bullets in each volley of the 
+        enemy. Used to see if the volley fits in the bullet budget.'''
+        
+        #Return size of pattern.
+        return len(self.__pattern["offsets"])
+    
     def get_type(self):
         '''This method returns the enemy type to determine numbers of types on 
         screen in main.'''
@@ -712,9 +1378,8 @@ class Enemy(pygame.sprite.Sprite):
             self.__temp_down_frames = self.__down_frames
             self.__temp_active_frames = self.__active_frames
             
-            #Set target degrees to none as appropriate to type 2 pattern
-            if self.__enemy_type == 2:
-                self.__target_degs = None
+            #Let go of aim held by pattern during active frames.
+            patterns.end_cycle(self.__pattern, self.__pattern_state)
         
         #Tick down frames and active frames if appropriate.
         if self.__temp_down_frames > 0 and self.__lock != 1: 
@@ -729,16 +1394,17 @@ class Enemy(pygame.sprite.Sprite):
             self.__dx = -self.__dx
             
         #move class/sprite according to vectors.
-        self.rect.centerx += self.__dx
+        self.__x += self.__dx
         
-        if not self.rect.centery >= self.__target_y:
-            self.rect.centery += self.__dy
+        if not self.__y >= self.__target_y:
+            self.__y += self.__dy
         else:
             self.__dx = 0
             self.__dy = 0
             self.__lock = 0
+        self.rect.center = (int(self.__x), int(self.__y))
         
-class Explosion(pygame.sprite.Sprite):
+class Explosion(Pooled_sprite):
     '''This class creates a Explosion animation depending on type.'''
     
     def __init__(self, xy_position, explosion_type):
@@ -747,18 +1413,20 @@ class Explosion(pygame.sprite.Sprite):
         explosion type is used to load appropriate image.
         '''
         # Call the parent __init__() method
-        pygame.sprite.Sprite.__init__(self)    
+        Pooled_sprite.__init__(self)    
+        
+        #Set up instances.
+        self.reset(xy_position, explosion_type)
+        
+    def reset(self, xy_position, explosion_type):
+        '''This method sets up the explosion again with the same parameters
+        as __init__, used when it is reused from its pool.'''
         
-        #Set up and load frames depending on type
-        self.__frames = []
+        #Shared frames depending on type
         if explosion_type == 0:
-            for num in range(4):
-                self.__frames.append(pygame.image.load("images/death"
-                                            +str(num)+".png").convert_alpha())
+            self.__frames = load_frames("images/death", 4)
         elif explosion_type == 1:
-            for num in range(3):
-                self.__frames.append(pygame.image.load("images/burst"
-                                            +str(num)+".png").convert_alpha())
+            self.__frames = load_frames("images/burst", 3)
                 
         #Set up instances.
         self.image = self.__frames[0]
@@ -786,54 +1454,55 @@ class Explosion(pygame.sprite.Sprite):
                 self.image = self.__frames[self.__index]
             self.__temp_refresh = self.__frame_refresh
             
-class Bullet(pygame.sprite.Sprite):
+#Speed of every bullet type in pixels per frame. Types 0 and 1 are the 
+#player's, the rest are fired by enemy types 1-5.
+BULLET_SPEEDS = [20, 20, 6, 6, 6, 4, 4]
+#Collision radius of every bullet type, about the size of its round shape.
+BULLET_RADII = [7, 6, 8, 13, 7, 5, 5]
+#Radius of the hitbox and of grazing around the player center.
+HITBOX_RADIUS = 1
+GRAZE_RADIUS = 16
+
+class Bullet(Pooled_sprite):
     '''This is the Bullet class sprite that creates a bullet that is used to 
     hit the player or the enemies. The direction will vary on degrees passed in.
     '''
     
-    def __init__(self, screen, shooter, shoot_type, degs = None):
+    def __init__(self, shooter, shoot_type, degs = None):
         '''This method initializes the bullet sprite using parameters such 
-        as screen, shooter of bullet, shoot type, and degrees.'''
+        as shooter of bullet, shoot type, and degrees. Bullets leaving the 
+        screen are culled by their Projectile_group.'''
    
         # Call the parent __init__() method
-        pygame.sprite.Sprite.__init__(self)
+        Pooled_sprite.__init__(self)
+        
+        #Set up instances.
+        self.reset(shooter, shoot_type, degs)
+        
+    def reset(self, shooter, shoot_type, degs = None):
+        '''This method sets up the bullet again with the same parameters as 
+        __init__, used when it is reused from its pool.'''
         
         #Load appropriate image for bullet depending on shoot type.
-        self.image = pygame.image.load("images/bullet"
-                                       +str(shoot_type)+".png").convert_alpha()
+        self.image = load_image("images/bullet"+str(shoot_type)+".png")
         
         #Set up default values.
         self.rect = self.image.get_rect()
         self.rect.center = shooter.rect.center
-        self.__screen = screen
+        self.__x = float(self.rect.centerx)
+        self.__y = float(self.rect.centery)
         self.__dx = 0
         self.__dy = 0
         self.__grazed = 0
-        self.__graze_frames = 10
         self.__shoot_type = shoot_type
-        self.__temp_graze = self.__graze_frames
         
-        #Set unique bullet speed and direction depending on shoot type.
+        #Set unique bullet speed and direction depending on shoot type. 
+        #Type 0 goes straight up.
+        speed = BULLET_SPEEDS[shoot_type]
         if shoot_type == 0:
-            self.__dy = -20
-        elif shoot_type ==1:
-            self.__dx = math.cos(math.radians(degs)) * 20
-            self.__dy = -(math.sin(math.radians(degs)) * 20)            
-        elif shoot_type == 2:
-            self.__dx = math.cos(math.radians(degs)) * 6
-            self.__dy = -(math.sin(math.radians(degs)) * 6)
-        elif shoot_type ==3:         
-            self.__dx = math.cos(math.radians(degs)) * 6
-            self.__dy = -(math.sin(math.radians(degs)) * 6)    
-        elif shoot_type ==4:
-            self.__dx = math.cos(math.radians(degs)) * 6
-            self.__dy = -(math.sin(math.radians(degs)) * 6)  
-        elif shoot_type == 5:
-            self.__dx = math.cos(math.radians(degs)) * 4
-            self.__dy = -(math.sin(math.radians(degs)) * 4)           
-        elif shoot_type == 6:
-            self.__dx = math.cos(math.radians(degs)) * 4
-            self.__dy = -(math.sin(math.radians(degs)) * 4)
+            self.__dy = -speed
+        else:
+            self.__dx, self.__dy = velocities([degs], speed)[0]
             
     def set_grazed(self, mode):
         '''This method sets it so that the bullet is grazed.'''
@@ -854,28 +1523,298 @@ class Bullet(pygame.sprite.Sprite):
         
         #Return instance.
         return self.__grazed
+    
+    def get_radius(self):
+        '''This method returns the collision radius of the bullet type.'''
+        
+        #Return radius of type.
+        return BULLET_RADII[self.__shoot_type]
         
     def update(self):
         '''This method will be called automatically to reposition the
         bullet sprite on the screen.'''
             
-        #Reposition
-        self.rect.centery += self.__dy  
-        self.rect.centerx += self.__dx
-        
-        #Graze reset
-        if self.__grazed == 1:
-            self.__temp_graze -= 1
-            if self.__temp_graze == 0:
-                self.__grazed = 0
-                self.__temp_graze = self.__graze_frames
+        #Reposition exactly, rect is moved to the whole pixels.
+        self.__x += self.__dx
+        self.__y += self.__dy
+        self.rect.center = (int(self.__x), int(self.__y))
+
             
-        #Kill bullet if out of screen for effciency.
-        if (0 >= self.rect.bottom or self.rect.top >= 
-            self.__screen.get_height()) or (0 >= self.rect.right or
-                self.rect.left >= self.__screen.get_width()-200):
+def playfield(screen):
+    '''This function returns the rect of the playfield on the screen 
+    parameter, the part left of the score tab.'''
+    
+    #Score tab is the 200 pixels on the right.
+    return pygame.Rect(0, 0, screen.get_width()-200, screen.get_height())
+
+def blit_all(surface, blit_list):
+    '''This function blits every (image, position) pair of the blit_list 
+    parameter on the surface parameter in one call where pygame can.'''
+    
+    #fblits skips the rects blits would return.
+    if hasattr(surface, "fblits"):
+        surface.fblits(blit_list)
+    elif hasattr(surface, "blits"):
+        surface.blits(blit_list, False)
+    else:
+        for image, position in blit_list:
+            surface.blit(image, position)
+
+#Side of the square cells of spatial hashes over the playfield.
+GRID_CELL = 40
+
+class Spatial_hash(object):
+    '''This class is a spatial hash of sprites by the grid cell of their rect
+    center. Queries only look at sprites in cells near the rect asked for.'''
+    
+    def __init__(self, cell_size = GRID_CELL):
+        '''This method initializes an empty hash with the cell_size 
+        parameter as the side of its cells.'''
+        
+        #Set up instances.
+        self.__cell = cell_size
+        self.__cells = {}
+        self.__reach = 0
+        
+    def build(self, sprites):
+        '''This method empties the hash and inserts every sprite of the 
+        sprites parameter in the cell of its rect center.'''
+        
+        #Rebuild cells, queries reach out by half the biggest sprite.
+        cell = self.__cell
+        cells = {}
+        reach = 0
+        for sprite in sprites:
+            rect = sprite.rect
+            key = (rect.centerx//cell, rect.centery//cell)
+            if key in cells:
+                cells[key].append(sprite)
+            else:
+                cells[key] = [sprite]
+            reach = max(reach, rect.width, rect.height)
+        self.__cells = cells
+        self.__reach = reach//2+1
+    
+    def query(self, rect):
+        '''This method returns the list of sprites in the cells near the rect
+        parameter. Only those can collide with it.'''
+        
+        #Gather sprites of cells the rect covers, reaching out for sprites 
+        #centered outside of it.
+        cell, reach, cells = self.__cell, self.__reach, self.__cells
+        found = []
+        for column in range((rect.left-reach)//cell, 
+                            (rect.right+reach)//cell+1):
+            for row in range((rect.top-reach)//cell, 
+                             (rect.bottom+reach)//cell+1):
+                if (column, row) in cells:
+                    found.extend(cells[(column, row)])
+        return found
+
+class Batch_group(pygame.sprite.OrderedUpdates):
+    '''This class is a sprite group of many small sprites drawn in one batch
+    instead of one blit at a time. Used for bullets, drops and explosions.'''
+    
+    def draw(self, surface):
+        '''This method blits every sprite in order on the surface parameter. 
+        No dirty rects are kept, the screen is flipped whole.'''
+        
+        #One batch of all images at their rects.
+        blit_all(surface, [(sprite.image, sprite.rect) for sprite in 
+                           self.sprites()])
+
+class Projectile_group(Batch_group):
+    '''This class is a sprite group of projectiles that kills all sprites 
+    that left its area in one pass after they are updated, instead of every
+    sprite checking the screen itself.'''
+    
+    def __init__(self, area):
+        '''This method initializes the group with the area parameter, the 
+        rect sprites must collide with to stay alive.'''
+        
+        # Call the parent __init__() method
+        Batch_group.__init__(self)
+        
+        #Set instances.
+        self.__area = area
+        self.__culled = 0
+        self.__total_culled = 0
+        
+        #Spatial hash of sprites, rebuilt when sprites changed.
+        self.__grid = Spatial_hash()
+        self.__grid_built = 0
+    
+    def add_internal(self, sprite, *args):
+        '''This method is called by pygame when a sprite is added. The
+        spatial hash is rebuilt before it is used next.'''
+        
+        #Add, hash is out of date.
+        Batch_group.add_internal(self, sprite, *args)
+        self.__grid_built = 0
+    
+    def remove_internal(self, sprite):
+        '''This method is called by pygame when a sprite is removed. The
+        spatial hash is rebuilt before it is used next.'''
+        
+        #Remove, hash is out of date.
+        Batch_group.remove_internal(self, sprite)
+        self.__grid_built = 0
+    
+    def query(self, rect):
+        '''This method returns the list of sprites in the spatial hash cells
+        near the rect parameter. Only those can collide with it.'''
+        
+        #Build once after sprites changed.
+        if not self.__grid_built:
+            self.__grid.build(self.sprites())
+            self.__grid_built = 1
+        return self.__grid.query(rect)
+    
+    def collide_pairs(self, sprites):
+        '''This method returns the list of (sprite, projectile) pairs of every
+        projectile colliding with one of the sprites parameter. Each 
+        projectile is paired with the first sprite it collides with only.'''
+        
+        #One hash of projectiles, each sprite only looks at cells near it.
+        #Rects that collide are checked pixel by pixel if it is on.
+        pixel = get_pixel_collision()
+        pairs = []
+        paired = set()
+        for sprite in sprites:
+            for projectile in self.query(sprite.rect):
+                if projectile not in paired and \
+                   sprite.rect.colliderect(projectile.rect) and (not pixel or
+                   masks_collide(load_mask(sprite.image), sprite.rect.topleft,
+                                 load_mask(projectile.image), 
+                                 projectile.rect.topleft)):
+                    paired.add(projectile)
+                    pairs.append((sprite, projectile))
+        return pairs
+        
+    def update(self):
+        '''This method updates every sprite, then kills sprites out of the 
+        area for efficiency.'''
+        
+        #Move sprites, hash is out of date.
+        Batch_group.update(self)
+        self.__grid_built = 0
+        
+        #One collision pass for all rects, kill those outside.
+        sprites = self.sprites()
+        inside = self.__area.collidelistall([sprite.rect for sprite in 
+                                             sprites])
+        culled = len(sprites) - len(inside)
+        if culled:
+            inside = set(inside)
+            for index in range(len(sprites)):
+                if index not in inside:
+                    sprites[index].kill()
+        
+        #Record counts.
+        self.__culled = culled
+        self.__total_culled += culled
+    
+    def get_cull_stats(self):
+        '''This method returns the number of sprites culled in the last 
+        update and in all updates as a tuple.'''
+        
+        #Return instances.
+        return self.__culled, self.__total_culled
+
+class Bullet_group(Projectile_group):
+    '''This class is the sprite group of enemy bullets, used when NumPy is 
+    not available for the bullet engine. It has the same methods as 
+    bullet_engine.Bullet_engine so main works with either.'''
+    
+    def __init__(self, screen):
+        '''This method initializes the group using the screen parameter to 
+        know the playfield size.'''
+        
+        # Call the parent __init__() method
+        Projectile_group.__init__(self, playfield(screen))
+        
+        #Set instances, frames left until grazed bullets can be grazed again.
+        self.__graze_frames = 10
+        self.__graze_timers = {}
+        
+    def add_volley(self, volley):
+        '''This method adds one bullet sprite per degree of the volley 
+        parameter, a (shooter, shoot type, list of degrees) tuple.'''
+        
+        #Create bullets.
+        shooter, shoot_type, degs_list = volley
+        for degs in degs_list:
+            self.add(acquire(Bullet, shooter, shoot_type, degs))
             
-            self.kill()
+    def collide_player(self, center, hit_radius, graze_radius):
+        '''This method tests the player against all bullets in one pass. 
+        Returns (True, 0) if a bullet is within the hit_radius parameter of 
+        the center parameter. Otherwise every bullet within graze_radius that
+        is not grazed yet is set to grazed, returns (False, how many).'''
+        
+        #Broadphase, bullets in cells near the player.
+        x_pos, y_pos = center
+        near = self.query(pygame.Rect(x_pos-graze_radius, y_pos-graze_radius,
+                                      2*graze_radius, 2*graze_radius))
+        
+        #Squared distances between circles of bullets near. Circles that 
+        #collide are checked pixel by pixel with the hitbox if it is on.
+        pixel = get_pixel_collision()
+        distances = []
+        for bullet in near:
+            delta_x = bullet.rect.centerx - x_pos
+            delta_y = bullet.rect.centery - y_pos
+            distances.append(delta_x*delta_x + delta_y*delta_y)
+            radius = bullet.get_radius() + hit_radius
+            if distances[-1] < radius*radius and (not pixel or masks_collide(
+                hitbox_mask(hit_radius), (x_pos-hit_radius, y_pos-hit_radius),
+                load_mask(bullet.image), bullet.rect.topleft)):
+                return True, 0
+        grazed = 0
+        for bullet, distance in zip(near, distances):
+            radius = bullet.get_radius() + graze_radius
+            if distance < radius*radius and not bullet.get_grazed():
+                bullet.set_grazed(1)
+                self.__graze_timers[bullet] = self.__graze_frames
+                grazed += 1
+        return False, grazed
+    
+    def update(self):
+        '''This method updates and culls bullets, then counts down the graze 
+        timers of grazed bullets only.'''
+        
+        #Move and cull.
+        Projectile_group.update(self)
+        
+        #Graze reset, killed bullets are forgotten.
+        for bullet in list(self.__graze_timers):
+            self.__graze_timers[bullet] -= 1
+            if not bullet.alive() or self.__graze_timers[bullet] == 0:
+                bullet.set_grazed(0)
+                del self.__graze_timers[bullet]
+    
+    def clear_bomb(self, bomb):
+        '''This method kills every bullet touching the ring of the bomb 
+        parameter and returns the centers for explosions, one per grid cell.
+        '''
+        
+        #Bullet circles touching the ring, between inner and outer radius.
+        inner, outer = bomb.get_radii()
+        x_pos, y_pos = bomb.get_center()
+        explosions = {}
+        for bullet in self.query(bomb.rect):
+            delta_x = bullet.rect.centerx - x_pos
+            delta_y = bullet.rect.centery - y_pos
+            distance = delta_x*delta_x + delta_y*delta_y
+            radius = bullet.get_radius()
+            if max(inner-radius, 0)**2 <= distance <= (outer+radius)**2:
+                #One explosion per cell, the first bullet cleared in it.
+                center = bullet.get_center()
+                key = (center[0]//GRID_CELL, center[1]//GRID_CELL)
+                if key not in explosions:
+                    explosions[key] = center
+                bullet.kill()
+        return list(explosions.values())
             
 #TO DO: SPAWNER
 class Spawner(pygame.sprite.Sprite):
@@ -969,26 +1908,32 @@ class Spawner(pygame.sprite.Sprite):
             if self.__temp_frames >= 0:
                 self.__temp_frames -= 1
                 
-class Pick_up(pygame.sprite.Sprite):
+class Pick_up(Pooled_sprite):
     '''The pick up class is used to spawn points, live and bomb drops to 
     enhance gameplay in main.'''
     
-    def __init__(self, screen, enemy, drop_type):
-            '''This method initializes the pick class using the screen parameter 
-            as bounaries, sprite to get spawn position and drop_type.'''
+    def __init__(self, enemy, drop_type):
+            '''This method initializes the pick class using the enemy sprite 
+            to get spawn position and drop_type. Pick ups leaving the screen 
+            are culled by their Projectile_group.'''
              
             # Call the parent __init__() method
-            pygame.sprite.Sprite.__init__(self)
+            Pooled_sprite.__init__(self)
             
-            #Set screen, drop type, and rate of speed update
-            self.__screen = screen
+            #Set up instances.
+            self.reset(enemy, drop_type)
+    
+    def reset(self, enemy, drop_type):
+            '''This method sets up the pick up again with the same parameters
+            as __init__, used when it is reused from its pool.'''
+            
+            #Set drop type, and rate of speed update
             self.__type = drop_type
             self.__speed_frames = 5
             self.__temp_speed = self.__speed_frames
             
             #Image loading 
-            self.image = pygame.image.load("images/drop"
-                +str(self.__type)+".png").convert_alpha()
+            self.image = load_image("images/drop"+str(self.__type)+".png")
             self.rect = self.image.get_rect()
             
             #Rect setting.
@@ -1010,10 +1955,6 @@ class Pick_up(pygame.sprite.Sprite):
     def update(self):
         '''This method is called automatically at the end of every frame to 
         update the sprite.'''
-
-        #Kill bullet if out of bottom for effciency.
-        if (self.rect.top >= self.__screen.get_height()):
-            self.kill()        
         
         #Update speed if appropriate
         if self.__temp_speed == 0:
@@ -1060,41 +2001,49 @@ class Score_tab(pygame.sprite.Sprite):
             #Brand new highscore.
             self.__highscore = 0
             
-        #Load image as main surface.
-        self.image = pygame.image.load("images/score_tab.png").convert()     
+        #Cached panel. The sprite image is a copy of it that is only redrawn
+        #in the regions whose values changed.
+        self.__base = load_image("images/score_tab.png", "opaque")
+        self.image = self.__base.copy()
         
         #Life frames image loading
         self.__life_frames = []
         for frame in range(2):
-            self.__life_frames.append(pygame.image.load(
-                "images/life"+str(frame)+".png").convert_alpha())         
+            self.__life_frames.append(load_image(
+                "images/life"+str(frame)+".png"))
         
         #Bomb frames image loading
         self.__bomb_frames = []
         for frame in range(2):
-            self.__bomb_frames.append(pygame.image.load(
-                "images/bomb"+str(frame)+".png").convert_alpha())         
+            self.__bomb_frames.append(load_image(
+                "images/bomb"+str(frame)+".png"))
         
         #Set default instances.
         self.rect = self.image.get_rect()
         self.rect.center = (screen.get_width()-self.rect.width/2,\
                             screen.get_height()/2)
         self.__screen = screen
-        self.__font = pygame.font.Font("fonts/go3v2.ttf", 25)
+        self.__font = load_font(*SCORE_FONT)
         self.__score = 0
-        self.__scores = ["HIGHSCORE", ("%10s" %(str(self.__highscore))).replace(
-            " ", "0"),
-                        "SCORE",("%10s" %(str(self.__score))).replace(" ", "0")] 
-        self.__score_labels = []
         self.__lives = 2
         self.__bombs = 1
-        self.__stats = ["LIVES", "BOMBS"]
-        self.__stat_labels = []
         self.__score_colour = (255,255,255)
         self.__stat_colour = (255,255,255)
+        self.__flash_colour = (255,99,71)
         self.__colour_frames = 15
         self.__temp_colour_frames = self.__colour_frames
         
+        #Pre-render digits and labels, done already when the loader ran.
+        preload_score_glyphs()
+        
+        #Values currently drawn on the image. None forces the first draw.
+        self.__drawn = {"colour": None, "highscore": None, "score": None, 
+                        "lives": None, "bombs": None}
+        
+        #Stat labels never change, draw them once.
+        self.image.blit(self.get_glyph("LIVES", self.__stat_colour), (10, 310))
+        self.image.blit(self.get_glyph("BOMBS", self.__stat_colour), (10, 385))
+        
     def add_points(self, point_type):
         '''This method add to the points value depending on the type of added 
         points. The type determines how much points are added'''
@@ -1168,8 +2117,61 @@ class Score_tab(pygame.sprite.Sprite):
         #Return instance.
         return self.__bombs
             
+    def get_glyph(self, text, colour):
+        '''This method returns the pre-rendered surface of the text parameter 
+        in the colour parameter. Glyphs come from the shared text cache, so new
+        games do not render them again.'''
+        
+        #Return shared glyph.
+        return render_text(SCORE_FONT[0], SCORE_FONT[1], text, 1, colour)
+    
+    def redraw(self, area, labels):
+        '''This method restores the area rect of the image from the cached 
+        panel, then blits the (surface, position) pairs in labels over it.'''
+        
+        #Restore panel under area.
+        self.image.blit(self.__base, area, area)
+        
+        #Blit new labels.
+        for label, position in labels:
+            self.image.blit(label, position)
+    
+    def score_labels(self, label, number, y_pos):
+        '''This method returns the (surface, position) pairs for a score label 
+        at the y_pos parameter with its 10 digit number underneath, made of 
+        glyphs in the current score colour.'''
+        
+        #Label first, then each digit next to the last.
+        labels = [(self.get_glyph(label, self.__score_colour), (10, y_pos))]
+        x_pos = 10
+        for digit in ("%10s" %(str(number))).replace(" ", "0"):
+            glyph = self.get_glyph(digit, self.__score_colour)
+            labels.append((glyph, (x_pos, y_pos+25)))
+            x_pos += glyph.get_width()
+        
+        #Return pairs.
+        return labels
+    
+    def icon_labels(self, frames, amount, y_pos):
+        '''This method returns the (surface, position) pairs for 3 life or 
+        bomb icons at the y_pos parameter, shaded depending on amount.'''
+        
+        #Lit icon if amount reached, otherwise the shaded one.
+        labels = []
+        x_pos = 0
+        for num in range(1, 4):
+            if amount >= num:
+                labels.append((frames[1], (10+x_pos, y_pos)))
+            else:
+                labels.append((frames[0], (10+x_pos, y_pos)))
+            x_pos += 40
+            
+        #Return pairs.
+        return labels
+            
     def update(self):
-        '''This method is called once per frame to update the score tab.'''
+        '''This method is called once per frame to update the score tab. Only
+        the values that changed since the last frame are redrawn.'''
         
         #Compare scores, flash colours at constant rate if score is highscore.
         if self.__score >= self.__highscore:
@@ -1178,62 +2180,40 @@ class Score_tab(pygame.sprite.Sprite):
                 self.__temp_colour_frames -=1
             if self.__temp_colour_frames == 0:
                 if self.__score_colour == (255,255,255):
-                    self.__score_colour = (255,99,71)
+                    self.__score_colour = self.__flash_colour
                 else:
                     self.__score_colour = (255,255,255)
                 self.__temp_colour_frames = self.__colour_frames      
         
-        #Refresh scores for refreshed labels
-        self.__scores = ["HIGHSCORE", ("%10s" %(str(self.__highscore))).replace(
-            " ", "0"),
-                        "SCORE",("%10s" %(str(self.__score))).replace(" ", "0")]        
-        
-        #Reset score labels
-        self.__score_labels = []   
-        self.__stat_labels = []  
-        
-        #Render all score labels
-        for score in self.__scores:
-            label = self.__font.render(score, 1, (self.__score_colour)) 
-            self.__score_labels.append(label)
-            
-        #Render all stat labels
-        for stat in self.__stats:
-            label = self.__font.render(stat, 1, (self.__stat_colour)) 
-            self.__stat_labels.append(label)        
-                       
-        #Blit image on to surface. 
-        self.image = pygame.image.load("images/score_tab.png").convert()
-        
-        #Blit labels accordinging to their y position.
-        y_pos = -20
-        for label_num in range(len(self.__score_labels)):
-            if label_num %2 == 0:
-                y_pos += 50
-            else:
-                y_pos += 25
-            self.image.blit(self.__score_labels[label_num], (10,y_pos))   
-        
-        y_pos = 235
-        for label_num in range(len(self.__stat_labels)):
-            y_pos += 75          
-            self.image.blit(self.__stat_labels[label_num], (10,y_pos))  
-        
-        #Blit 3 life and bomb images with appropriate shade depending on amount.
-        x_pos = 0
-        for num in range(1, 4):
-            if self.__lives >= num: 
-                self.image.blit(self.__life_frames[1], (10+x_pos, 345))
-            else:
-                self.image.blit(self.__life_frames[0], (10+x_pos, 345))
-            x_pos += 40
-        x_pos = 0
-        for num in range(1, 4):
-            if self.__bombs >= num: 
-                self.image.blit(self.__bomb_frames[1], (10+x_pos, 420))
-            else:
-                self.image.blit(self.__bomb_frames[0], (10+x_pos, 420))
-            x_pos += 40        
+        #A colour change redraws both score blocks.
+        width = self.rect.width-10
+        height = 25+self.__font.get_height()
+        recolour = self.__drawn["colour"] != self.__score_colour
+        self.__drawn["colour"] = self.__score_colour
+        
+        #Redraw highscore block if changed.
+        if recolour or self.__drawn["highscore"] != self.__highscore:
+            self.__drawn["highscore"] = self.__highscore
+            self.redraw(pygame.Rect(10, 30, width, height), self.score_labels(
+                "HIGHSCORE", self.__highscore, 30))
+        
+        #Redraw score block if changed.
+        if recolour or self.__drawn["score"] != self.__score:
+            self.__drawn["score"] = self.__score
+            self.redraw(pygame.Rect(10, 105, width, height), 
+                        self.score_labels("SCORE", self.__score, 105))
+        
+        #Redraw life icons if changed.
+        if self.__drawn["lives"] != self.__lives:
+            self.__drawn["lives"] = self.__lives
+            self.redraw(pygame.Rect(10, 345, 110, 30), self.icon_labels(
+                self.__life_frames, self.__lives, 345))
+        
+        #Redraw bomb icons if changed.
+        if self.__drawn["bombs"] != self.__bombs:
+            self.__drawn["bombs"] = self.__bombs
+            self.redraw(pygame.Rect(10, 420, 110, 30), self.icon_labels(
+                self.__bomb_frames, self.__bombs, 420))
         
 class Cloud(pygame.sprite.Sprite):
     '''This is a cloud class that is used to make background more lively.'''
@@ -1254,8 +2234,7 @@ class Cloud(pygame.sprite.Sprite):
         self.random_speed()
         
         #Image loading 
-        self.image = pygame.image.load("images/cloud"
-            +str(self.__type)+".png").convert_alpha()
+        self.image = load_image("images/cloud"+str(self.__type)+".png")
         self.rect = self.image.get_rect()
         
         #Set position.
@@ -1320,7 +2299,7 @@ class Background(pygame.sprite.Sprite):
         self.rect.left, self.rect.top = (0,0)
         
         #Load image and initialize other instances.
-        self.__background = pygame.image.load("images/background.png").convert()
+        self.__background = load_image("images/background.png", "opaque")
         self.__background_y = -440
         self.__dy = 1
         
@@ -8,7 +8,7 @@
 """
 
 # I - IMPORT AND INITIALIZE
-import pygame, game_sprites, random
+import pygame, game_sprites, bullet_engine, patterns, random
 
 #pre_init reduces sound delay
 pygame.mixer.pre_init(44100, -16, 1, 512)
@@ -18,16 +18,31 @@ pygame.init()
 def main():
     '''This function defines the 'mainline logic' for PROJECT: Witchcraft.'''
       
+    #Read assets from the packed archive if there is one.
+    game_sprites.open_archive()
+    
+    #Compiled enemy patterns, from the cache unless the file changed.
+    patterns.load_patterns()
+    
     # DISPLAY - set display resolution and caption.
     screen_size = (640, 480)
     screen = pygame.display.set_mode(screen_size)    
-    pygame.display.set_icon(pygame.image.load(
-        "images/icon.png").convert_alpha())
+    pygame.display.set_icon(game_sprites.load_image("images/icon.png"))
     pygame.display.set_caption("PROJECT: Witchcraft")
     
+    #Only what the title screen needs is loaded before it shows.
+    game_sprites.load_image("images/title.png", "opaque")
+    game_sprites.preload_sounds(["sounds/select.ogg", "sounds/ok.ogg", 
+                                 "sounds/reset.ogg"])
+    
+    #Decode every other image and sound on a worker thread while the title
+    #screen runs, screens then share the cached objects.
+    loader = game_sprites.Asset_loader(game_sprites.IMAGE_MANIFEST, 
+                                       game_sprites.SOUND_VOLUMES)
+    loader.start()
 
     #Set up main menu loop 
-    while game_intro(screen):
+    while game_intro(screen, loader):
         #If game loop if over via window exit, kill game. instead of loop back.
         if not game_loop(screen):
             break
@@ -52,7 +67,7 @@ def pause(screen):
                           flags=pygame.SRCALPHA)
     dark.fill((50, 50, 50, 0))
     background.blit(dark, (0, 0), special_flags=pygame.BLEND_RGBA_SUB)    
-    paused = pygame.image.load("images/paused.png").convert_alpha()
+    paused = game_sprites.load_image("images/paused.png")
     background.blit(
         paused, ((screen.get_width()-330)/2, screen.get_height()-300))
     screen.blit(background, (0, 0))
@@ -66,10 +81,8 @@ def pause(screen):
     all_sprites = pygame.sprite.Group(buttons)
 
     #Sound effects 
-    select_sound = pygame.mixer.Sound("sounds/select.ogg")
-    ok = pygame.mixer.Sound("sounds/ok.ogg")
-    select_sound.set_volume(0.3)
-    ok.set_volume(0.3)
+    select_sound = game_sprites.load_sound("sounds/select.ogg")
+    ok = game_sprites.load_sound("sounds/ok.ogg")
     
     # A - Action (broken into ALTER steps)
      
@@ -77,8 +90,9 @@ def pause(screen):
     clock = pygame.time.Clock()
     keep_going = True
     FPS = 30
-    #Starting select.
-    selected = [buttons[0]]    
+    #Starting select, nothing drawn yet.
+    selected = [buttons[0]]
+    drawn = None
      
     # L - Loop
     while keep_going:
@@ -92,6 +106,9 @@ def pause(screen):
                 keep_going = False
                 #Window exit return value from pause to game loop
                 return 2
+            #Window uncovered, draw the menu again.
+            elif event.type == pygame.VIDEOEXPOSE:
+                drawn = None
             #Navigate through buttons 
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_UP:
@@ -113,16 +130,19 @@ def pause(screen):
                         #Return menu value
                         return 0                     
                                     
-        #Select button highlight
-        for select in selected:
-            select.set_select()
-     
-        # R - Refresh display
-        all_sprites.clear(screen, background)
-        all_sprites.update()
-        all_sprites.draw(screen)       
-        pygame.display.flip()        
-        pygame.display.flip()       
+        #Idle menus are not redrawn, only when the selection changes.
+        if selected != drawn:
+            drawn = selected
+            
+            #Select button highlight
+            for select in selected:
+                select.set_select()
+         
+            # R - Refresh display
+            all_sprites.clear(screen, background)
+            all_sprites.update()
+            all_sprites.draw(screen)       
+            pygame.display.flip()
 
 
 def game_over(screen):
@@ -138,7 +158,7 @@ def game_over(screen):
                           flags=pygame.SRCALPHA)
     dark.fill((50, 50, 50, 0))
     background.blit(dark, (0, 0), special_flags=pygame.BLEND_RGBA_SUB)      
-    game_over = pygame.image.load("images/game_over.png").convert_alpha()
+    game_over = game_sprites.load_image("images/game_over.png")
     background.blit(
         game_over, ((screen.get_width()-400)/2, screen.get_height()-300))
     screen.blit(background, (0, 0))
@@ -153,10 +173,8 @@ def game_over(screen):
     all_sprites = pygame.sprite.Group(buttons)
 
     #Sound effects 
-    select_sound = pygame.mixer.Sound("sounds/select.ogg")
-    ok = pygame.mixer.Sound("sounds/ok.ogg")
-    select_sound.set_volume(0.3)
-    ok.set_volume(0.3)
+    select_sound = game_sprites.load_sound("sounds/select.ogg")
+    ok = game_sprites.load_sound("sounds/ok.ogg")
     
     # A - Action (broken into ALTER steps)
      
@@ -164,8 +182,9 @@ def game_over(screen):
     clock = pygame.time.Clock()
     keep_going = True
     FPS = 30
-    #Starting select.
-    selected = [buttons[0]]    
+    #Starting select, nothing drawn yet.
+    selected = [buttons[0]]
+    drawn = None
      
     # L - Loop
     while keep_going:
@@ -179,6 +198,9 @@ def game_over(screen):
                 keep_going = False
                 #Window exit return value
                 return 2
+            #Window uncovered, draw the menu again.
+            elif event.type == pygame.VIDEOEXPOSE:
+                drawn = None
             #Navigate through buttons 
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_UP:
@@ -200,24 +222,28 @@ def game_over(screen):
                         #Return menu value
                         return 0                     
                                     
-        #Select button highlight
-        for select in selected:
-            select.set_select()
-     
-        # R - Refresh display
-        all_sprites.clear(screen, background)
-        all_sprites.update()
-        all_sprites.draw(screen)       
-        pygame.display.flip()        
-        pygame.display.flip()     
+        #Idle menus are not redrawn, only when the selection changes.
+        if selected != drawn:
+            drawn = selected
+            
+            #Select button highlight
+            for select in selected:
+                select.set_select()
+         
+            # R - Refresh display
+            all_sprites.clear(screen, background)
+            all_sprites.update()
+            all_sprites.draw(screen)       
+            pygame.display.flip()
     
-def game_intro(screen):
+def game_intro(screen, loader):
     '''This function defines the main menu logic for the game PROJECT: 
     Witchcraft. This function accepts a display parameter to know which surface
-    to blit all events.'''
+    to blit all events. The loader parameter is the startup asset loader, its
+    progress is shown and the game only starts once it is done.'''
     
     # E - Entities - background, buttons and sprite group set up
-    background = pygame.image.load("images/title.png").convert()
+    background = game_sprites.load_image("images/title.png", "opaque")
     screen.blit(background, (0, 0))
     start_button = game_sprites.Button(
         (screen.get_width()/2, screen.get_height()-130), "Start", (0,0,0))
@@ -232,16 +258,11 @@ def game_intro(screen):
     
     #Sounds
     #Background music
-    pygame.mixer.music.load("sounds/main_menu.ogg")
-    pygame.mixer.music.set_volume(0.3)
-    pygame.mixer.music.play(-1)
+    game_sprites.play_music("sounds/main_menu.ogg")
     #Sound effects
-    select_sound = pygame.mixer.Sound("sounds/select.ogg")
-    ok = pygame.mixer.Sound("sounds/ok.ogg")
-    reset = pygame.mixer.Sound("sounds/reset.ogg")
-    select_sound.set_volume(0.3)
-    ok.set_volume(0.3)
-    reset.set_volume(0.3)
+    select_sound = game_sprites.load_sound("sounds/select.ogg")
+    ok = game_sprites.load_sound("sounds/ok.ogg")
+    reset = game_sprites.load_sound("sounds/reset.ogg")
     
     # A - Action (broken into ALTER steps)
      
@@ -249,14 +270,22 @@ def game_intro(screen):
     clock = pygame.time.Clock()
     keep_going = True
     FPS = 30
-    #Starting select.
-    selected = [buttons[0]]    
+    #Starting select, nothing drawn yet.
+    selected = [buttons[0]]
+    drawn = None
+    #Loading bar along the bottom, start waits for loading to finish.
+    loading_bar = pygame.Rect(0, screen.get_height()-4, screen.get_width(), 4)
+    progress = None
+    starting = False
      
         # L - Loop
     while keep_going:
      
         # T - Timer to set frame rate
         clock.tick(FPS)
+        
+        #Hand assets decoded by the worker to the caches.
+        loaded = loader.poll()
      
         # E - Event handling
         for event in pygame.event.get():
@@ -264,8 +293,11 @@ def game_intro(screen):
                 keep_going = False
                 #Return exit game value.
                 return 0
-            #Navigate through buttons 
-            elif event.type == pygame.KEYDOWN:
+            #Window uncovered, draw the menu again.
+            elif event.type == pygame.VIDEOEXPOSE:
+                drawn = None
+            #Navigate through buttons, unless already starting.
+            elif event.type == pygame.KEYDOWN and not starting:
                 if event.key == pygame.K_UP:
                     if selected != [start_button]:
                         select_sound.play()
@@ -277,13 +309,12 @@ def game_intro(screen):
                 #Confirming button press on z.
                 if event.key == pygame.K_z:
                     if selected != [erase_button]:
-                        keep_going = False
                         ok.play()
                         if selected == [start_button]:
-                            pygame.mixer.music.stop()
-                            #Return start game loop value.
-                            return 1
+                            #Start once every asset is loaded.
+                            starting = True
                         elif selected == [quit_button]:
+                            keep_going = False
                             #Return exit game value. 
                             return 0
                     else:
@@ -293,16 +324,35 @@ def game_intro(screen):
                         save_data.write(str(0))
                         save_data.close()                        
                                     
-        #Select button highlight
-        for select in selected:
-            select.set_select()
-     
-        # R - Refresh display
-        all_sprites.clear(screen, background)
-        all_sprites.update()
-        all_sprites.draw(screen)       
-        pygame.display.flip()        
-        pygame.display.flip()   
+        #Idle menus are not redrawn, only when the selection changes.
+        if selected != drawn:
+            drawn = selected
+            
+            #Select button highlight
+            for select in selected:
+                select.set_select()
+         
+            # R - Refresh display
+            all_sprites.clear(screen, background)
+            all_sprites.update()
+            all_sprites.draw(screen)       
+            pygame.display.flip()
+            
+        #Redraw loading bar when progress changes, erase it when done.
+        if loaded != progress:
+            progress = loaded
+            screen.blit(background, loading_bar, loading_bar)
+            if progress < 1:
+                screen.fill((255,99,71), (loading_bar.left, loading_bar.top,
+                    int(loading_bar.width*progress), loading_bar.height))
+            pygame.display.update(loading_bar)
+        
+        #Start game when everything is resident.
+        if starting and loader.get_done():
+            keep_going = False
+            pygame.mixer.music.stop()
+            #Return start game loop value.
+            return 1
 
 def game_loop(screen):
     '''This function defines the main game logic for the game PROJECT:
@@ -319,38 +369,25 @@ def game_loop(screen):
         stick.init()
         joysticks.append(stick)  
         
-    #Sound - loading and setting volume
+    #Sound - shared from the sound bank, volumes already set.
     
     #Music
-    pygame.mixer.music.load("sounds/background.ogg")
-    pygame.mixer.music.set_volume(0.2)
-    pygame.mixer.music.play(-1)
+    game_sprites.play_music("sounds/background.ogg")
     
     #Sound effects.
-    paused = pygame.mixer.Sound("sounds/pause.ogg")
-    player_death = pygame.mixer.Sound("sounds/player_death.ogg")
-    player_shoot = pygame.mixer.Sound("sounds/player_shoot.ogg")
-    graze = pygame.mixer.Sound("sounds/graze.ogg")
-    point = pygame.mixer.Sound("sounds/point.ogg")
-    enemy_death = pygame.mixer.Sound("sounds/enemy_death.ogg")
-    life_drop = pygame.mixer.Sound("sounds/get_life.ogg")
-    bomb_drop = pygame.mixer.Sound("sounds/get_bomb.ogg")
-    bombing = pygame.mixer.Sound("sounds/bomb.ogg")
+    paused = game_sprites.load_sound("sounds/pause.ogg")
+    player_death = game_sprites.load_sound("sounds/player_death.ogg")
+    player_shoot = game_sprites.load_sound("sounds/player_shoot.ogg")
+    graze = game_sprites.load_sound("sounds/graze.ogg")
+    point = game_sprites.load_sound("sounds/point.ogg")
+    enemy_death = game_sprites.load_sound("sounds/enemy_death.ogg")
+    life_drop = game_sprites.load_sound("sounds/get_life.ogg")
+    bomb_drop = game_sprites.load_sound("sounds/get_bomb.ogg")
+    bombing = game_sprites.load_sound("sounds/bomb.ogg")
     bullet_sounds = []
     for sound in range(1,6):
-        bullet_sounds.append(pygame.mixer.Sound("sounds/bullet"+
+        bullet_sounds.append(game_sprites.load_sound("sounds/bullet"+
             str(sound)+".ogg"))
-    paused.set_volume(0.3)
-    player_death.set_volume(0.3)
-    player_shoot.set_volume(0.1)
-    graze.set_volume(0.3)
-    point.set_volume(0.3)
-    enemy_death.set_volume(0.4)
-    life_drop.set_volume(0.4)
-    bomb_drop.set_volume(0.4)
-    bombing.set_volume(0.4)
-    for bullet_sound in bullet_sounds:
-        bullet_sound.set_volume(0.1)
         
     #Player sprite creation, append them in a list.
     player = game_sprites.Player(screen)
@@ -373,17 +410,22 @@ def game_loop(screen):
     low_sprites = pygame.sprite.OrderedUpdates(spawners, background, clouds,
         player, hitbox)
     enemy_sprites = pygame.sprite.OrderedUpdates()
-    player_bullet_sprites = pygame.sprite.OrderedUpdates()
-    enemy_bullet_sprites = pygame.sprite.OrderedUpdates()
+    player_bullet_sprites = game_sprites.Projectile_group(
+        game_sprites.playfield(screen))
+    enemy_bullets = bullet_engine.create_enemy_bullets(screen)
+    budget = bullet_engine.create_budget(enemy_bullets)
     bomb_sprites = pygame.sprite.OrderedUpdates()
-    animation_sprites = pygame.sprite.OrderedUpdates()
-    drop_sprites = pygame.sprite.OrderedUpdates()
+    animation_sprites = game_sprites.Batch_group()
+    #Drops only leave through the bottom of the screen.
+    drop_sprites = game_sprites.Projectile_group(pygame.Rect(
+        -screen.get_width(), -screen.get_height(), 3*screen.get_width(),
+        2*screen.get_height()))
     top_sprites = pygame.sprite.OrderedUpdates(score_tab)
     
-    #All sprites groups up, layering with order
-    all_sprites = pygame.sprite.OrderedUpdates(low_sprites, enemy_sprites, \
-    player_bullet_sprites, enemy_bullet_sprites, animation_sprites, \
-    drop_sprites, top_sprites)
+    #All sprite layers, drawn in order.
+    layers = [low_sprites, enemy_sprites, player_bullet_sprites, 
+              enemy_bullets, animation_sprites, bomb_sprites, drop_sprites,
+              top_sprites]
 
     # ASSIGN - assign important variables to start game.
     clock = pygame.time.Clock()
@@ -458,8 +500,9 @@ def game_loop(screen):
                 player.focus_mode(0)
                 hitbox.set_visible(0)
                 
-        #Record frames_passed
+        #Record frames_passed, bullets alive at start of frame.
         frames_passed += 1
+        budget.start_frame(len(enemy_bullets))
         
         #Difficulty based on frames passed.
         if frames_passed == FPS*30:
@@ -488,18 +531,17 @@ def game_loop(screen):
         #Enemy bullet/sprites. Hit detection, only if player not invincible
         if not player.get_invincible(): 
             
-            #Enemy bullets - player hitbox collision.
-            for hit in pygame.sprite.spritecollide(
-                hitbox, enemy_bullet_sprites.sprites(), False):
-                #Shrink the hitbox rect to detect actual size of hitbox
-                if hitbox.rect.inflate(-14,-14).colliderect(hit) and \
-                   not player.get_invincible():
-                    #Player death events
-                    animation_sprites.add(game_sprites.Explosion(
-                        player.get_center(), 0))
-                    player_death.play()
-                    player.reset()
-                    score_tab.life_loss()
+            #Enemy bullets - player collision in one pass. Circles of the 
+            #actual size of hitbox, and of grazing around the player.
+            hit, grazed = enemy_bullets.collide_player(player.get_center(),
+                game_sprites.HITBOX_RADIUS, game_sprites.GRAZE_RADIUS)
+            if hit:
+                #Player death events
+                animation_sprites.add(game_sprites.acquire(
+                    game_sprites.Explosion, player.get_center(), 0))
+                player_death.play()
+                player.reset()
+                score_tab.life_loss()
                     
             #Enemy sprites - hitbox collision
             for enemy in pygame.sprite.spritecollide(
@@ -508,22 +550,18 @@ def game_loop(screen):
                 if hitbox.rect.inflate(-14,-14).colliderect(enemy) and \
                    not player.get_invincible():
                     #Player death events
-                    animation_sprites.add(game_sprites.Explosion(
-                        player.get_center(), 0))
+                    animation_sprites.add(game_sprites.acquire(
+                        game_sprites.Explosion, player.get_center(), 0))
                     player_death.play()
                     player.reset()
                     score_tab.life_loss()
             
             #Grazing bullets, bullets/player sprite collision - add points.
-            for bullet in pygame.sprite.spritecollide(
-                player, enemy_bullet_sprites.sprites(), False):  
-                if player.rect.inflate(-6,-12).colliderect(bullet) and \
-                   not player.get_invincible():
-                    #Graze events if bullet can be grazed
-                    if not bullet.get_grazed():
-                        graze.play()
-                        score_tab.add_points(0)
-                        bullet.set_grazed(1)
+            if not player.get_invincible():
+                #Graze events for every bullet that was grazed
+                for bullet in range(grazed):
+                    graze.play()
+                    score_tab.add_points(0)
                     
         #Player sprite, drop sprite collision events.
         for drop in  pygame.sprite.spritecollide(
@@ -540,75 +578,71 @@ def game_loop(screen):
             score_tab.add_points((drop_type)+6) #+6 is used for drop points
             drop.kill()
                  
-        #Enemy rect and shoot events.
-        for enemy in enemy_sprites.sprites():  
-            #See if enemy is hit by bullet. Return list of bullet that hit.
-            for bullet in pygame.sprite.spritecollide(
-                enemy, player_bullet_sprites.sprites(), False):
-                #Bullet hits enemy. Animate, damage and kill bullet.
-                animation_sprites.add(
-                    game_sprites.Explosion(bullet.get_center(), 1))
-                enemy.damaged(1)
-                bullet.kill()
-                #Kill enemy if appropriate.
-                if enemy.get_hp() <= 0 and not enemy.get_killed():
-                    #Play enemy death sound.
-                    enemy_death.play()
-                    #Set enemy instance killed to true.
-                    enemy.set_killed()
-                    animation_sprites.add(game_sprites.Explosion(
-                        enemy.get_center(), 0))
-                    #Drop sprites when enemy killed. Determine #drops.
-                    if enemy.get_type() <= 3:
-                        drops = 4
-                    elif enemy.get_type() > 3:
-                        drops = 2
-                    #Determine drop type.
-                    for drop in range(drops):
-                        random_num = random.randrange(15)
-                        #3 in 15 chance of droping big points
-                        if random_num == 3 or random_num == 7 or \
-                           random_num == 12:
-                            drop_type = 1
-                        #Special drops for only boss types, 1 in 15 chance.
-                        elif random_num == 5 and drops == 4:
-                            #2 in 3 chance bomb drop, 1 in 3 chance life drop.
-                            random_special = random.randrange(3)
-                            if random_special == 1:
-                                drop_type = 2
-                            else:
-                                drop_type = 3
-                        #Drop type normal if no special drops is called.
+        #Player bullets - enemy collision. All hit pairs in one pass, a 
+        #bullet only hits the first enemy it collides with.
+        for enemy, bullet in player_bullet_sprites.collide_pairs(
+            enemy_sprites.sprites()):
+            #Bullet hits enemy. Animate, damage and kill bullet.
+            animation_sprites.add(game_sprites.acquire(
+                game_sprites.Explosion, bullet.get_center(), 1))
+            enemy.damaged(1)
+            bullet.kill()
+            #Kill enemy if appropriate.
+            if enemy.get_hp() <= 0 and not enemy.get_killed():
+                #Play enemy death sound.
+                enemy_death.play()
+                #Set enemy instance killed to true.
+                enemy.set_killed()
+                animation_sprites.add(game_sprites.acquire(
+                    game_sprites.Explosion, enemy.get_center(), 0))
+                #Drop sprites when enemy killed. Determine #drops.
+                if enemy.get_type() <= 3:
+                    drops = 4
+                elif enemy.get_type() > 3:
+                    drops = 2
+                #Determine drop type.
+                for drop in range(drops):
+                    random_num = random.randrange(15)
+                    #3 in 15 chance of droping big points
+                    if random_num == 3 or random_num == 7 or \
+                       random_num == 12:
+                        drop_type = 1
+                    #Special drops for only boss types, 1 in 15 chance.
+                    elif random_num == 5 and drops == 4:
+                        #2 in 3 chance bomb drop, 1 in 3 chance life drop.
+                        random_special = random.randrange(3)
+                        if random_special == 1:
+                            drop_type = 2
                         else:
-                            drop_type = 0
-                        #Create drop sprite
-                        drop_sprites.add(game_sprites.Pick_up(
-                            screen, enemy, drop_type))
-                    #Add the score of the corresponding enemy killed.
-                    score_tab.add_points(enemy.get_type())
-           
-            #Let enemy shoot if appropriate.
+                            drop_type = 3
+                    #Drop type normal if no special drops is called.
+                    else:
+                        drop_type = 0
+                    #Create drop sprite
+                    drop_sprites.add(game_sprites.acquire(
+                        game_sprites.Pick_up, enemy, drop_type))
+                #Add the score of the corresponding enemy killed.
+                score_tab.add_points(enemy.get_type())
+
+        #Enemy shoot events.
+        for enemy in enemy_sprites.sprites():  
+            #Let enemy shoot if appropriate, held while bullets are over 
+            #budget.
             if not enemy.get_cool_rate() and not enemy.get_down_frames() \
-               and not enemy.get_lock():
+               and not enemy.get_lock() and not \
+               budget.hold(enemy, enemy.get_volley_size()):
                 #Play bullet sound correpsonding to their bullet type
-                bullet_sounds[enemy.get_type()-1].play()
-                #Create bullets.
-                enemy_bullet_sprites.add(enemy.spawn_bullet(player)) 
+                budget.play(bullet_sounds[enemy.get_type()-1])
+                #Create bullets, thinned to fit budget.
+                enemy_bullets.add_volley(budget.admit(
+                    enemy.spawn_volley(player)))
         
         #Bomb detection event. See if it hits bullets. Return list of bullets
         for bomb in bomb_sprites.sprites():
-            for bullet in pygame.sprite.spritecollide(
-                bomb, enemy_bullet_sprites.sprites(), False):
-                #See if bomb is too small to detect collision with rim, 
-                #use entire area to detect area of bomb.
-                #If not to small, use approximate bomb rim area to detect hit 
-                #by seeing if it doesn't collide with outside.
-                if bomb.get_side() <= 140 or not bomb.rect.inflate(
-                    -bomb.get_side()/4,-bomb.get_side()/4).colliderect(bullet):
-                    #Animate and kill bullet.
-                    animation_sprites.add(
-                        game_sprites.Explosion(bullet.get_center(), 0))
-                    bullet.kill()    
+            #Animate bullets killed by the bomb rim.
+            for center in enemy_bullets.clear_bomb(bomb):
+                animation_sprites.add(game_sprites.acquire(
+                    game_sprites.Explosion, center, 0))
     
         #Detect enemies, record types on screen.
         common_enemies = 0
@@ -643,17 +677,23 @@ def game_loop(screen):
                 restart = game_over(screen)
                 keep_going = False
                 
-        #Update what is in the all_sprites group.
-        all_sprites = pygame.sprite.OrderedUpdates(low_sprites, enemy_sprites,
-            player_bullet_sprites, enemy_bullet_sprites,
-            animation_sprites, bomb_sprites, drop_sprites, top_sprites)
-                         
-        # REFRESH SCREEN - clear previous sprites, update positions and display
-        all_sprites.clear(screen, background.get_surface())
-        all_sprites.update()
-        all_sprites.draw(screen)       
-        pygame.display.flip()  
-    
+        # REFRESH SCREEN - update positions and display layers in order. 
+        #Background and score tab cover the whole screen, so no clear.
+        for layer in layers:
+            layer.update()
+        for layer in layers:
+            layer.draw(screen)
+        pygame.display.flip()
+
+    #Kill pooled sprites left after game so they go back to their pools,
+    #enemy bullets are only sprites without the bullet engine.
+    pooled_groups = [player_bullet_sprites, animation_sprites, drop_sprites]
+    if isinstance(enemy_bullets, pygame.sprite.AbstractGroup):
+        pooled_groups.append(enemy_bullets)
+    for group in pooled_groups:
+        for sprite in group.sprites():
+            sprite.kill()
+
     #Save highscore after game.
     save_data = open("data/highscore.txt", 'w')
     save_data.write(str(score_tab.get_highscore()))
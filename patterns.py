@@ -0,0 +1,262 @@
+"""Description: Bullet patterns for the game "PROJECT: Witchcraft". Enemy
+   patterns and timings are read from data/patterns.json and compiled into
+   tables once, so every volley is a few table lookups. The enemy bullet
+   engine or group then creates all of the volley at once.
+"""
+
+# I - IMPORT AND INITIALIZE
+import random, json, hashlib, os
+
+PATTERN_FILE = "data/patterns.json"
+#Compiled patterns with the hash of the file they were compiled from.
+PATTERN_CACHE = "data/patterns.cache"
+
+#Every enemy type in the pattern file has these timings:
+#"hp" - damage taken before death.
+#"cool_rate" - frames between volleys.
+#"down_frames", "active_frames" - frames resting, then frames shooting.
+#"base" is where the volley points:
+#"aim" - at the target with jitter, a randrange of extra degrees.
+#"held_aim" - like aim, but held until the enemy ends its active frames.
+#"spiral" - from "start" turns by "change" degrees every volley, bouncing
+#off "bounds" with a new change of "step" times a randrange of "factors".
+#"random" - a randrange of "choices" degrees.
+#Bullets are fired at every "offsets" degrees from the base, "ring" is a
+#number of bullets evenly spread around the base instead.
+TIMINGS = ["hp", "cool_rate", "down_frames", "active_frames"]
+BASES = ["aim", "held_aim", "spiral", "random"]
+#Fields every base needs on top of the timings.
+BASE_FIELDS = {"aim": ["jitter"], "held_aim": ["jitter"],
+               "spiral": ["factors", "bounds"], "random": ["choices"]}
+
+#Compiled patterns by enemy type, loaded on first use.
+_patterns = {}
+
+def ring(count):
+    '''This function returns the offsets of the count parameter number of
+    bullets evenly spread around a full circle.'''
+
+    #Whole degrees when count divides the circle.
+    if 360 % count == 0:
+        return list(range(0, 360, 360//count))
+    return [360.0*bullet/count for bullet in range(count)]
+
+def fan(center, offsets):
+    '''This function returns the degrees of a fan of bullets, one at each of
+    the offsets parameter from the center parameter.'''
+
+    #Return degrees.
+    return [center+offset for offset in offsets]
+
+def aimed(aim, jitter):
+    '''This function returns the aim parameter turned by a random number of
+    degrees picked from the jitter parameter, a list.'''
+
+    #Return degrees.
+    return aim + random.choice(jitter)
+
+def spiral_step(degs, change, step, factors, bounds):
+    '''This function turns the degs parameter by the change parameter. When
+    degs has left the bounds (low, high) while still turning away, change
+    turns around to step times a factor picked from the factors list.
+    Returns the new degrees and change.'''
+
+    #Turn around at bounds, random factor for speed.
+    factor = random.choice(factors)
+    if degs < bounds[0] and change < 0:
+        change = step * factor
+    elif degs > bounds[1] and change > 0:
+        change = -step * factor
+    return degs+change, change
+
+def compile_pattern(source):
+    '''This function compiles the source parameter, one enemy type of the
+    pattern file, into a dictionary of tables. Every randrange becomes the
+    list it picks from and rings become offsets.'''
+
+    #Check pattern.
+    for name in TIMINGS + ["base"]:
+        if name not in source:
+            raise ValueError("Pattern is missing " + name)
+    if source["base"] not in BASES:
+        raise ValueError("Unknown pattern base " + str(source["base"]))
+    for name in BASE_FIELDS[source["base"]]:
+        if name not in source:
+            raise ValueError("Pattern base " + source["base"] +
+                             " is missing " + name)
+    if "ring" in source and (not isinstance(source["ring"], int) or
+                             source["ring"] <= 0):
+        raise ValueError("Pattern ring must be a positive number of bullets")
+
+    #Timings are copied as they are.
+    pattern = {"base": str(source["base"])}
+    for name in TIMINGS:
+        pattern[name] = int(source[name])
+
+    #Lists to pick from instead of randrange.
+    for name in ["jitter", "factors", "choices"]:
+        if name in source:
+            pattern[name] = list(range(*source[name]))
+
+    #Spiral values.
+    pattern["start"] = source.get("start", 0)
+    pattern["change"] = source.get("change", 0)
+    pattern["step"] = source.get("step", 0)
+    pattern["bounds"] = tuple(source.get("bounds", (0, 0)))
+
+    #Offsets of every bullet from the base.
+    if "ring" in source:
+        pattern["offsets"] = ring(source["ring"])
+    else:
+        pattern["offsets"] = list(source.get("offsets", [0]))
+    check_pattern(pattern)
+    return pattern
+
+def check_pattern(pattern):
+    '''This function raises ValueError if the pattern parameter, a compiled
+    pattern, is missing anything its volleys use, so a bad pattern fails
+    when it is loaded instead of on its first volley.'''
+
+    #Timings and a known base.
+    for name in TIMINGS:
+        if not isinstance(pattern.get(name), int):
+            raise ValueError("Pattern is missing " + name)
+    if pattern.get("base") not in BASES:
+        raise ValueError("Unknown pattern base " + str(pattern.get("base")))
+
+    #Lists picked from must have something to pick.
+    for name in BASE_FIELDS[pattern["base"]]:
+        if not pattern.get(name):
+            raise ValueError("Pattern base " + pattern["base"] +
+                             " has no " + name)
+    if len(pattern.get("bounds", ())) != 2:
+        raise ValueError("Pattern bounds must be (low, high)")
+    for name in ["start", "change", "step", "offsets"]:
+        if name not in pattern:
+            raise ValueError("Pattern is missing " + name)
+
+def compile_patterns(data):
+    '''This function compiles the data parameter, the text of a pattern
+    file, and returns a dictionary of enemy types to compiled patterns.'''
+
+    #Enemy types are the keys of the file.
+    sources = json.loads(data)
+    compiled = {}
+    for enemy_type in sources:
+        compiled[int(enemy_type)] = compile_pattern(sources[enemy_type])
+    return compiled
+
+def load_cached(cached):
+    '''This function returns the compiled patterns of the cached parameter,
+    patterns read back from the JSON cache. Enemy types become numbers and
+    bounds tuples again. Raises ValueError if a pattern is incomplete.'''
+
+    #JSON keeps keys as text and tuples as lists.
+    compiled = {}
+    for enemy_type in cached:
+        pattern = cached[enemy_type]
+        pattern["bounds"] = tuple(pattern.get("bounds", ()))
+        check_pattern(pattern)
+        compiled[int(enemy_type)] = pattern
+    return compiled
+
+def save_cache(cache_path, digest, compiled):
+    '''This function writes the compiled parameter patterns with the digest
+    parameter hash to the cache_path file. A failed write removes the file
+    so no half written cache is left.'''
+
+    #Write cache, delete partial file on failure.
+    try:
+        cache = open(cache_path, 'w')
+        try:
+            json.dump({"digest": digest, "patterns": compiled}, cache)
+        finally:
+            cache.close()
+    except (IOError, OSError, TypeError, ValueError):
+        try:
+            os.remove(cache_path)
+        except OSError:
+            pass
+
+def load_patterns(path = PATTERN_FILE, cache_path = PATTERN_CACHE):
+    '''This function loads the compiled patterns of the file at the path
+    parameter. The cache_path file is used when it was compiled from a file
+    with the same hash, otherwise the file is compiled and cached again.'''
+
+    #Hash of the pattern file decides if the cache is still good.
+    source = open(path, 'rb')
+    data = source.read()
+    source.close()
+    digest = hashlib.sha1(data).hexdigest()
+
+    #Try cache first.
+    compiled = None
+    if os.path.exists(cache_path):
+        try:
+            cache = open(cache_path, 'r')
+            try:
+                cached = json.load(cache)
+            finally:
+                cache.close()
+            if cached["digest"] == digest:
+                compiled = load_cached(cached["patterns"])
+        except Exception:
+            compiled = None
+
+    #Compile and save for next time, the game runs without a cache too.
+    if compiled == None:
+        compiled = compile_patterns(data.decode("utf-8"))
+        save_cache(cache_path, digest, compiled)
+
+    #Replace patterns in use.
+    _patterns.clear()
+    _patterns.update(compiled)
+    return _patterns
+
+def enemy_pattern(enemy_type):
+    '''This function returns the compiled pattern of the enemy_type
+    parameter, loading the pattern file on first use.'''
+
+    #Load once.
+    if not _patterns:
+        load_patterns()
+    return _patterns[enemy_type]
+
+def new_state(pattern):
+    '''This function returns the state an enemy keeps between the volleys of
+    the pattern parameter, a compiled pattern.'''
+
+    #Held degrees and spiral change.
+    return {"degs": None, "change": pattern["change"]}
+
+def end_cycle(pattern, state):
+    '''This function is called when an enemy ends its active frames. A held
+    aim of the pattern parameter in the state parameter is let go.'''
+
+    #Aim again next cycle.
+    if pattern["base"] == "held_aim":
+        state["degs"] = None
+
+def volley(pattern, aim, state):
+    '''This function returns the list of degrees of every bullet of the next
+    volley of the pattern parameter. aim is the degrees to the target and
+    state is from new_state, updated for the next volley.'''
+
+    #Find base of volley.
+    base = pattern["base"]
+    if base == "aim":
+        state["degs"] = aimed(aim, pattern["jitter"])
+    elif base == "held_aim":
+        if state["degs"] == None:
+            state["degs"] = aimed(aim, pattern["jitter"])
+    elif base == "spiral":
+        if state["degs"] == None:
+            state["degs"] = pattern["start"]
+        state["degs"], state["change"] = spiral_step(state["degs"],
+            state["change"], pattern["step"], pattern["factors"],
+            pattern["bounds"])
+    elif base == "random":
+        state["degs"] = random.choice(pattern["choices"])
+
+    #Bullets at offsets from base.
+    return fan(state["degs"], pattern["offsets"])